@@ -1,5 +1,7 @@
 import os
 
+import pytest
+
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 root_dir_content = os.listdir(BASE_DIR)
 PROJECT_DIR_NAME = 'yatube'
@@ -37,3 +39,11 @@ pytest_plugins = [
     'tests.fixtures.fixture_user',
     'tests.fixtures.fixture_data',
 ]
+
+
+@pytest.fixture(autouse=True)
+def isolated_media(settings, tmp_path):
+    """Картинки тестов — во временный каталог, миниатюры — без пула
+    процессов: процессы пула открыли бы настоящую db.sqlite3."""
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+    settings.THUMBNAIL_WORKERS = 0
@@ -0,0 +1,251 @@
+import json
+import os
+import sys
+import time
+from io import BytesIO
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from about.urls import urlpatterns as about_urls
+from posts.models import Group, Post
+from posts.urls import urlpatterns as posts_urls
+from users.urls import urlpatterns as users_urls
+from yatube.wsgi import application
+
+User = get_user_model()
+
+ROUTES = (
+    ('posts', posts_urls),
+    ('users', users_urls),
+    ('about', about_urls),
+)
+# Маршруты, которые меняют данные или сессию, либо требуют
+# одноразовых токенов: их замер искажает следующие замеры.
+SKIPPED = {
+    'posts:add_comment': 'пишет комментарий',
+    'posts:profile_follow': 'меняет подписки',
+    'posts:profile_unfollow': 'меняет подписки',
+    'users:logout': 'завершает сессию',
+    'users:password_reset_confirm': 'нужен токен сброса пароля',
+    # В базе seed_yatube нет staff: замерялся бы ответ 403.
+    'posts:api_cache_stats': 'только для staff',
+}
+# Маршруты только для автора: замеряются от имени автора из
+# sample_kwargs, иначе это редирект или 403.
+AUTHOR_ROUTES = {'posts:post_edit', 'posts:profile_export'}
+# Строки запроса: без них поиск замерялся бы на пустом запросе.
+QUERIES = {
+    'posts:search': {'q': 'пост'},
+    'posts:search_api': {'q': 'пост'},
+}
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmarks',
+                                'baseline.json')
+
+
+def percentile(values, fraction):
+    """Перцентиль по ближайшему рангу для отсортированного списка."""
+    index = max(0, min(len(values) - 1,
+                       int(round(fraction * len(values) + 0.5)) - 1))
+    return values[index]
+
+
+def wsgi_environ(path, cookie):
+    path, _, query = path.partition('?')
+    return {
+        'REQUEST_METHOD': 'GET',
+        'PATH_INFO': path,
+        'QUERY_STRING': query,
+        'SERVER_NAME': 'localhost',
+        'SERVER_PORT': '80',
+        'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': 'localhost',
+        'HTTP_COOKIE': cookie,
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'http',
+        'wsgi.input': BytesIO(),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+
+
+class Command(BaseCommand):
+    help = ('Замеряет задержку, число запросов и размер ответа для '
+            'маршрутов posts, users и about через WSGI-приложение')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=50,
+                            help='Запросов на маршрут')
+        parser.add_argument('--warmup', type=int, default=3)
+        parser.add_argument('--anonymous', action='store_true',
+                            help='Замерять без авторизации')
+        parser.add_argument('--output', help='Куда сохранить JSON')
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument('--no-compare', action='store_true')
+        parser.add_argument('--latency-threshold', type=float, default=0.2,
+                            help='Допустимый относительный рост p95')
+        parser.add_argument('--latency-floor', type=float, default=2.0,
+                            help='Рост p95 меньше стольких мс — шум')
+        parser.add_argument('--queries-threshold', type=int, default=0,
+                            help='Допустимый рост числа запросов')
+        parser.add_argument('--bytes-threshold', type=float, default=0.1,
+                            help='Допустимый относительный рост ответа')
+
+    def handle(self, *args, **options):
+        if not Post.objects.exists():
+            raise CommandError('База пуста: сначала выполните seed_yatube')
+        self.samples = self.sample_kwargs()
+        if options['anonymous']:
+            reader_cookie = author_cookie = ''
+        else:
+            reader_cookie = self.session_cookie(
+                User.objects.annotate(total=Count('follower'))
+                .order_by('-total').first()
+            )
+            author_cookie = self.session_cookie(
+                User.objects.get(username=self.samples['username'])
+            )
+        results = {}
+        for namespace, patterns in ROUTES:
+            for pattern in patterns:
+                name = f'{namespace}:{pattern.name}'
+                if name in SKIPPED or (options['anonymous']
+                                       and name in AUTHOR_ROUTES):
+                    continue
+                results[name] = self.measure(
+                    self.url(name, pattern),
+                    author_cookie if name in AUTHOR_ROUTES else reader_cookie,
+                    options['requests'], options['warmup'],
+                )
+                self.report(name, results[name])
+        report = {
+            'meta': {
+                'requests': options['requests'],
+                'anonymous': options['anonymous'],
+                'posts': Post.objects.count(),
+            },
+            'routes': results,
+        }
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2, ensure_ascii=False,
+                          sort_keys=True)
+        if not options['no_compare'] and os.path.exists(options['baseline']):
+            self.compare(report, options)
+
+    def sample_kwargs(self):
+        """Аргументы маршрутов: самые нагруженные объекты базы."""
+        author = (User.objects.annotate(total=Count('posts'))
+                  .order_by('-total').first())
+        group = (Group.objects.annotate(total=Count('posts'))
+                 .order_by('-total').first())
+        post = (Post.objects.filter(author=author)
+                .annotate(total=Count('comments'))
+                .order_by('-total').first())
+        return {
+            'username': author.username,
+            'slug': group.slug if group else 'missing',
+            'post_id': post.pk,
+        }
+
+    def session_cookie(self, user):
+        client = Client()
+        client.force_login(user)
+        session = client.cookies[settings.SESSION_COOKIE_NAME].value
+        return f'{settings.SESSION_COOKIE_NAME}={session}'
+
+    def url(self, name, pattern):
+        kwargs = {
+            key: self.samples[key] for key in pattern.pattern.converters
+        }
+        url = reverse(name, kwargs=kwargs)
+        if name in QUERIES:
+            url += '?' + urlencode(QUERIES[name])
+        return url
+
+    def measure(self, path, cookie, requests, warmup):
+        cache.clear()
+        timings = []
+        queries = size = status = 0
+        for number in range(warmup + requests):
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                status, size = self.call(path, cookie)
+                elapsed = time.perf_counter() - started
+            if number >= warmup:
+                timings.append(elapsed * 1000)
+                queries = len(context.captured_queries)
+        timings.sort()
+        return {
+            'path': path,
+            'status': status,
+            'p50_ms': round(percentile(timings, 0.50), 3),
+            'p95_ms': round(percentile(timings, 0.95), 3),
+            'p99_ms': round(percentile(timings, 0.99), 3),
+            'queries': queries,
+            'bytes': size,
+        }
+
+    def call(self, path, cookie):
+        captured = {}
+
+        def start_response(status, headers, exc_info=None):
+            captured['status'] = int(status.split()[0])
+
+        response = application(wsgi_environ(path, cookie), start_response)
+        try:
+            size = sum(len(chunk) for chunk in response)
+        finally:
+            if hasattr(response, 'close'):
+                response.close()
+        return captured['status'], size
+
+    def report(self, name, result):
+        self.stdout.write(
+            f'{name:32} {result["status"]} '
+            f'p50={result["p50_ms"]:.1f}ms p95={result["p95_ms"]:.1f}ms '
+            f'p99={result["p99_ms"]:.1f}ms q={result["queries"]} '
+            f'{result["bytes"]}B'
+        )
+
+    def compare(self, report, options):
+        with open(options['baseline']) as file:
+            baseline = json.load(file)['routes']
+        regressions = []
+        for name, result in report['routes'].items():
+            base = baseline.get(name)
+            if base is None:
+                regressions.append(
+                    f'{name}: нет в базовой линии, перезапишите её '
+                    f'(--output {options["baseline"]})')
+                continue
+            if result['p95_ms'] > max(
+                    base['p95_ms'] * (1 + options['latency_threshold']),
+                    base['p95_ms'] + options['latency_floor']):
+                regressions.append(
+                    f'{name}: p95 {base["p95_ms"]} -> {result["p95_ms"]} мс')
+            if result['queries'] > base['queries'] + options[
+                    'queries_threshold']:
+                regressions.append(
+                    f'{name}: запросов {base["queries"]} -> '
+                    f'{result["queries"]}')
+            if result['bytes'] > base['bytes'] * (
+                    1 + options['bytes_threshold']):
+                regressions.append(
+                    f'{name}: размер {base["bytes"]} -> {result["bytes"]}')
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно базовой линии:\n'
+                + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет'))
@@ -0,0 +1,33 @@
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replicas import replicate
+
+
+class Command(BaseCommand):
+    help = ('Копирует основную SQLite-базу в реплики DATABASE_REPLICAS '
+            '(заменитель репликации для локального запуска)')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--interval', type=float,
+                            help='Повторять каждые N секунд')
+
+    def handle(self, *args, **options):
+        if not settings.DATABASE_REPLICAS:
+            raise CommandError(
+                'Реплик нет: задайте YATUBE_REPLICAS=<число реплик>'
+            )
+        while True:
+            started = time.perf_counter()
+            for alias in settings.DATABASE_REPLICAS:
+                replicate(settings.DATABASES['default']['NAME'],
+                          settings.DATABASES[alias]['NAME'])
+            self.stdout.write(
+                f'Реплики обновлены за '
+                f'{(time.perf_counter() - started) * 1000:.0f} мс'
+            )
+            if not options['interval']:
+                return
+            time.sleep(options['interval'])
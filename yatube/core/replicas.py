@@ -0,0 +1,114 @@
+import random
+import sqlite3
+import threading
+import time
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+PIN_COOKIE = 'primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Отставшая реплика без свежей сессии разлогинила бы пользователя.
+PRIMARY_APPS = ('sessions',)
+
+_state = threading.local()
+
+
+def use_primary():
+    return getattr(_state, 'use_primary', False)
+
+
+def _replica():
+    """Реплика текущего запроса: выбирается один раз на запрос.
+
+    Иначе соседние запросы к базе одной страницы читали бы с реплик
+    с разным отставанием.
+    """
+    replicas = settings.DATABASE_REPLICAS
+    replica = getattr(_state, 'replica', None)
+    if replica not in replicas:
+        replica = _state.replica = random.choice(replicas)
+    return replica
+
+
+def note_write():
+    """Отмечает запись текущего запроса (в том числе сделанную чужим
+    потоком, см. core.sqlite.WriteCoordinator)."""
+    _state.wrote = True
+
+
+class ReplicaRouter:
+    """Чтение с реплик из DATABASE_REPLICAS, запись — в default.
+
+    На основную базу читают запросы, которые пишут (небезопасные методы),
+    запросы сессий, закреплённых после записи (ReplicaPinMiddleware),
+    всё внутри открытой транзакции на default и таблица сессий.
+    """
+
+    def db_for_read(self, model, **hints):
+        replicas = settings.DATABASE_REPLICAS
+        if (not replicas or use_primary()
+                or model._meta.app_label in PRIMARY_APPS
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return _replica()
+
+    def db_for_write(self, model, **hints):
+        note_write()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Реплики — копии default: объекты с разных алиасов совместимы.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in settings.DATABASE_REPLICAS
+
+
+class ReplicaPinMiddleware:
+    """Read-your-writes: после записи сессия читает с default.
+
+    Запрос, который что-то записал, ставит cookie на
+    REPLICA_PIN_SECONDS секунд — дольше, чем отстаёт реплика.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        pinned_until = request.COOKIES.get(PIN_COOKIE, '')
+        try:
+            pinned = float(pinned_until) > time.time()
+        except ValueError:
+            pinned = False
+        _state.use_primary = pinned or request.method not in SAFE_METHODS
+        _state.wrote = False
+        _state.replica = None
+        try:
+            response = self.get_response(request)
+            if _state.wrote:
+                seconds = settings.REPLICA_PIN_SECONDS
+                response.set_cookie(
+                    PIN_COOKIE, str(time.time() + seconds), max_age=seconds,
+                    httponly=True, samesite='Lax',
+                )
+        finally:
+            _state.use_primary = False
+            _state.wrote = False
+            _state.replica = None
+        return response
+
+
+def replicate(source_path, target_path):
+    """Копирует SQLite-базу source_path в target_path через backup API.
+
+    Заменитель настоящей репликации для локального запуска: копия
+    согласованная, даже если в исходную базу в это время пишут.
+    """
+    source = sqlite3.connect(source_path)
+    target = sqlite3.connect(target_path)
+    try:
+        source.backup(target)
+    finally:
+        target.close()
+        source.close()
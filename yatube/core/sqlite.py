@@ -0,0 +1,128 @@
+import logging
+import queue
+import threading
+from concurrent.futures import Future, TimeoutError
+
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+from django.db.backends.signals import connection_created
+from django.dispatch import receiver
+
+from .replicas import note_write
+
+logger = logging.getLogger(__name__)
+
+
+@receiver(connection_created)
+def apply_pragmas(sender, connection, **kwargs):
+    """Настраивает каждое новое SQLite-соединение (SQLITE_PRAGMAS)."""
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        for name, value in settings.SQLITE_PRAGMAS.items():
+            cursor.execute(f'PRAGMA {name} = {value}')
+
+
+class WriteTimeout(OperationalError):
+    """Поток записи не выполнил задание за WRITE_TIMEOUT секунд."""
+
+
+class WriteCoordinator:
+    """Очередь записей процесса с групповым коммитом.
+
+    SQLite пускает одного писателя: потоки, которые пишут сами, ждут
+    блокировку и получают «database is locked». Здесь записи выполняет
+    один поток: он забирает из очереди до WRITE_BATCH_SIZE заданий,
+    выполняет каждое в своей точке сохранения и фиксирует их одной
+    транзакцией — один fsync на пачку вместо одного на запись.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def run(self, func, *args, **kwargs):
+        """Выполняет func в потоке записи и возвращает её результат.
+
+        Внутри открытой транзакции (и в самом потоке записи) func
+        выполняется сразу: её изменения должны попасть в эту транзакцию.
+        Если ответа нет за WRITE_TIMEOUT секунд, бросает WriteTimeout;
+        ещё не начатое задание при этом отменяется.
+        """
+        if (not settings.WRITE_COORDINATOR or connection.in_atomic_block
+                or threading.current_thread() is self._thread):
+            return func(*args, **kwargs)
+        # Запись сделает поток очереди: закрепляем запрос за default сами.
+        note_write()
+        future = Future()
+        self._queue.put((func, args, kwargs, future))
+        self._start()
+        try:
+            return future.result(timeout=settings.WRITE_TIMEOUT)
+        except TimeoutError:
+            started = not future.cancel()
+            raise WriteTimeout(
+                f'Запись не выполнена за {settings.WRITE_TIMEOUT} с '
+                f'(в очереди {self._queue.qsize()}, '
+                f'{"уже выполняется" if started else "отменена"})'
+            ) from None
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._loop, name='write-coordinator', daemon=True
+                )
+                self._thread.start()
+
+    def _take(self):
+        jobs = [self._queue.get()]
+        while len(jobs) < settings.WRITE_BATCH_SIZE:
+            try:
+                jobs.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return jobs
+
+    def _loop(self):
+        while True:
+            jobs = self._take()
+            try:
+                self._commit(jobs)
+            except Exception as error:
+                # Поток записи не должен умирать: иначе все следующие
+                # задания ждали бы до WRITE_TIMEOUT.
+                logger.exception('Write batch failed')
+                for *_, future in jobs:
+                    if not future.done():
+                        future.set_exception(error)
+
+    def _commit(self, jobs):
+        # Отменённые по таймауту задания не выполняются.
+        jobs = [job for job in jobs if job[-1].set_running_or_notify_cancel()]
+        results = []
+        try:
+            with transaction.atomic():
+                for func, args, kwargs, future in jobs:
+                    try:
+                        with transaction.atomic():
+                            results.append(
+                                (future, func(*args, **kwargs), None)
+                            )
+                    except Exception as error:
+                        results.append((future, None, error))
+        except Exception as error:
+            # Пачка не зафиксирована: сообщаем об этом всем её заданиям.
+            connection.close()
+            results = [(future, None, error) for *_, future in jobs]
+        # Ответы — только после коммита: вызвавший поток сразу
+        # читает то, что записал.
+        for future, result, error in results:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+
+writes = WriteCoordinator()
@@ -1,21 +1,134 @@
+import datetime as dt
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import cache
+from django.db.models import Min
+from django.utils import timezone
+
+from . import caching, search
+from .models import Comment, Follow, Group, Post, PostQuerySet
+from .paginators import EstimatedCountPaginator
+
+GROUP_CHOICES_KEY = 'admin:group_choices:{}'
+
+
+def group_choices():
+    """Варианты выбора группы, общие для всех строк и запросов.
+
+    Сбрасываются при изменении групп (signals.py).
+    """
+    version, = caching.get_versions('groups')
+    key = GROUP_CHOICES_KEY.format(version)
+    choices = cache.get(key)
+    if choices is None:
+        choices = list(
+            Group.objects.order_by('title').values_list('pk', 'title')
+        )
+        cache.set(key, choices, settings.PAGE_CACHE_TIMEOUT)
+    return choices
+
+
+def next_period(day, kind):
+    if kind == 'year':
+        return dt.date(day.year + 1, 1, 1)
+    if kind == 'month':
+        return (day.replace(day=28) + dt.timedelta(days=4)).replace(day=1)
+    return day + dt.timedelta(days=1)
+
+
+class IndexedDatesQuerySet(PostQuerySet):
+    """Посты для админки: date_hierarchy без прохода по всей таблице.
+
+    QuerySet.dates() группирует все строки (SELECT DISTINCT по дате).
+    Здесь каждый следующий период находится отдельным MIN(pub_date)
+    по индексу, так что запросов столько, сколько периодов в выборке.
+    """
+
+    def dates(self, field_name, kind, order='ASC'):
+        queryset = self.order_by()
+        periods = []
+        lookup = {}
+        while True:
+            first = queryset.filter(**lookup).aggregate(
+                first=Min(field_name)
+            )['first']
+            if first is None:
+                break
+            day = timezone.localtime(first).date()
+            if kind == 'year':
+                day = day.replace(month=1, day=1)
+            elif kind == 'month':
+                day = day.replace(day=1)
+            periods.append(day)
+            start = dt.datetime.combine(next_period(day, kind), dt.time())
+            lookup = {f'{field_name}__gte': timezone.make_aware(start)}
+        return periods[::-1] if order == 'DESC' else periods
 
-from .models import Group, Post
 
+class ScalableAdmin(admin.ModelAdmin):
+    """Список объектов для таблиц на миллионы строк.
 
-class PostAdmin(admin.ModelAdmin):
+    Вместо двух COUNT(*) по всей таблице — оценка числа строк.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    empty_value_display = '-пусто-'
+
+
+class PostAdmin(ScalableAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group',)
     list_editable = ('group',)
+    list_select_related = ('author', 'group')
     search_fields = ('text',)
     list_filter = ('pub_date',)
-    empty_value_display = '-пусто-'
+    date_hierarchy = 'pub_date'
+    autocomplete_fields = ('author',)
+
+    def get_queryset(self, request):
+        queryset = IndexedDatesQuerySet(self.model)
+        ordering = self.get_ordering(request)
+        if ordering:
+            queryset = queryset.order_by(*ordering)
+        return queryset.for_feed()
+
+    def get_search_results(self, request, queryset, search_term):
+        # Полнотекстовый индекс вместо LIKE '%...%' по всей таблице.
+        if not search_term:
+            return queryset, False
+        return search.search_posts(queryset, search_term), False
 
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        formfield = super().formfield_for_foreignkey(
+            db_field, request, **kwargs
+        )
+        if db_field.name == 'group':
+            # Иначе select каждой строки списка загружает все группы.
+            formfield.choices = [('', formfield.empty_label)]
+            formfield.choices += group_choices()
+        return formfield
 
-class GroupAdmin(admin.ModelAdmin):
-    list_display = ('title', 'description')
+
+class GroupAdmin(ScalableAdmin):
+    list_display = ('title', 'slug', 'posts_count', 'description')
     search_fields = ('title', 'description')
-    empty_value_display = '-пусто-'
+    prepopulated_fields = {'slug': ('title',)}
+
+
+class CommentAdmin(ScalableAdmin):
+    list_display = ('pk', 'text', 'created', 'post', 'author')
+    list_select_related = ('post', 'author')
+    raw_id_fields = ('post',)
+    autocomplete_fields = ('author',)
+
+
+class FollowAdmin(ScalableAdmin):
+    list_display = ('pk', 'user', 'author')
+    list_select_related = ('user', 'author')
+    autocomplete_fields = ('user', 'author')
 
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group, GroupAdmin)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+
+from .caching import stats, versioned_cache_page
+from .models import Group, Post, User
+from .paginators import CursorPaginator, decode_cursor, encode_cursor
+from . import timeline
+
+# Поле ответа -> колонка в values(). Здесь только то, что меняется
+# вместе с областями кеша лент: комментарии их не сбрасывают, поэтому
+# comments_count в ответе устаревал бы.
+FIELDS = {
+    'id': 'id',
+    'text': 'text',
+    'pub_date': 'pub_date',
+    'updated': 'updated',
+    'author': 'author__username',
+    'group': 'group__slug',
+    'image': 'image',
+}
+JSON_PARAMS = {'ensure_ascii': False, 'separators': (',', ':')}
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+
+
+def error(message, status):
+    return JsonResponse({'error': message}, status=status,
+                        json_dumps_params=JSON_PARAMS)
+
+
+def requested_fields(request):
+    """Поля из ?fields= или None, если среди них есть неизвестные."""
+    fields = [
+        name for name in request.GET.get('fields', '').split(',') if name
+    ]
+    if not fields:
+        return list(FIELDS)
+    if any(name not in FIELDS for name in fields):
+        return None
+    return fields
+
+
+def serialize(row, fields):
+    item = {}
+    for name in fields:
+        value = row[FIELDS[name]]
+        if name in ('pub_date', 'updated'):
+            value = value.isoformat()
+        elif name == 'image':
+            value = IMAGE_STORAGE.url(value) if value else None
+        item[name] = value
+    return item
+
+
+def feed_response(request, posts, field='pub_date'):
+    """JSON-страница ленты: те же querysets, что у HTML, но через values().
+
+    Без моделей, форм и шаблонов. Параметры запроса: fields=id,text —
+    какие поля вернуть; after=<next> — следующая (более старая)
+    страница; before=<previous> — посты новее первого, для опроса.
+    Курсор строится по field, как в get_page_obj.
+    """
+    fields = requested_fields(request)
+    if fields is None:
+        return error(f'Допустимые поля: {", ".join(FIELDS)}', 400)
+    # id и field нужны курсору, даже если клиент их не просил.
+    columns = {FIELDS[name] for name in fields} | {'id', field}
+    paginator = CursorPaginator(posts.values(*columns),
+                                settings.POSTS_PER_PAGE, field=field)
+    page = paginator.get_cursor_page(
+        after=decode_cursor(request.GET.get('after', '')),
+        before=decode_cursor(request.GET.get('before', '')),
+    )
+    return JsonResponse({
+        'results': [serialize(row, fields) for row in page],
+        'next': page.next_cursor,
+        # Курсор первого поста есть всегда: по нему опрашивают новые.
+        'previous': encode_cursor(page[0], field) if len(page) else None,
+    }, json_dumps_params=JSON_PARAMS)
+
+
+@versioned_cache_page('index')
+def index(request):
+    return feed_response(request, Post.objects.all())
+
+
+@versioned_cache_page('group:{slug}')
+def group_posts(request, slug):
+    group = get_object_or_404(Group, slug=slug)
+    return feed_response(request, group.posts.all())
+
+
+@versioned_cache_page('profile:{username}')
+def profile(request, username):
+    author = get_object_or_404(User, username=username)
+    return feed_response(request, author.posts.all())
+
+
+def follow_index(request):
+    if not request.user.is_authenticated:
+        return error('Требуется авторизация', 401)
+    return feed_response(request, timeline.feed_posts(request.user),
+                         field=timeline.FEED_FIELD)
+
+
+def cache_stats(request):
+    """Счётчики hit/miss/stale кешей страниц и фрагментов (caching.py)."""
+    if not request.user.is_staff:
+        return error('Недостаточно прав', 403)
+    return JsonResponse(stats(), json_dumps_params=JSON_PARAMS)
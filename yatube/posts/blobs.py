@@ -0,0 +1,52 @@
+import os
+import time
+
+from django.db import transaction
+from django.db.models import F
+from sorl.thumbnail import delete as delete_thumbnails
+
+from .models import ImageBlob, Post
+
+
+def retain(name):
+    """Учитывает ещё одну ссылку поста на файл name."""
+    if not name:
+        return
+    updated = ImageBlob.objects.filter(name=name).update(refs=F('refs') + 1)
+    if not updated:
+        # Файл загружен до подсчёта ссылок: считаем с нуля.
+        ImageBlob.objects.get_or_create(
+            name=name, defaults={'refs': Post.objects.filter(image=name)
+                                 .count()}
+        )
+
+
+def release(name):
+    """Снимает ссылку на файл и удаляет его, когда ссылок не осталось."""
+    if not name:
+        return
+    ImageBlob.objects.filter(name=name).update(refs=F('refs') - 1)
+    orphan = ImageBlob.objects.filter(name=name, refs__lte=0)
+    if orphan.exists() and not Post.objects.filter(image=name).exists():
+        orphan.delete()
+        released = time.time()
+        transaction.on_commit(lambda: _delete_file(name, released))
+
+
+def _delete_file(name, released):
+    """Удаляет файл, если с момента released на него не сослались снова.
+
+    Пока шёл коммит, тот же файл могли загрузить заново (хранилище
+    вернёт уже существующее имя): ссылки проверяются ещё раз под
+    блокировкой хранилища, а свежая отметка времени файла означает,
+    что его загрузку ещё не зафиксировали.
+    """
+    storage = Post._meta.get_field('image').storage
+    with storage.lock():
+        if (ImageBlob.objects.filter(name=name).exists()
+                or Post.objects.filter(image=name).exists()
+                or not storage.exists(name)
+                or os.path.getmtime(storage.path(name)) >= released):
+            return
+        delete_thumbnails(storage.open(name), delete_file=False)
+        storage.delete(name)
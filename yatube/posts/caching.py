@@ -0,0 +1,266 @@
+import hashlib
+import random
+import threading
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from core.replicas import use_primary
+from . import holes
+
+VERSION_KEY = 'version:{}'
+PAGE_KEY = 'page:{}'
+LOCK_KEY = 'lock:{}'
+STATS_KEY = 'cache_stats:{}:{}'
+# Имена страниц и фрагментов, для которых ведутся счётчики: в кеше,
+# чтобы их видели все процессы.
+STATS_NAMES_KEY = 'cache_stats:names'
+HIT, MISS, STALE = EVENTS = ('hit', 'miss', 'stale')
+
+# Стек пересчётов get_or_refresh в потоке: флаг «внутри отдано
+# устаревшее» для каждого вложенного compute.
+_computing = threading.local()
+
+
+def _new_version():
+    # Версия от времени, а не 1: если ключ версии вытеснен из кеша,
+    # новая версия не совпадёт со старыми закешированными страницами.
+    return int(time.time() * 1000)
+
+
+def get_versions(*scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Сбрасывает закешированные страницы указанных областей."""
+    for scope in scopes:
+        key = VERSION_KEY.format(scope)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, _new_version(), None)
+
+
+def bump_on_commit(*scopes):
+    """bump() сейчас и ещё раз после коммита текущей транзакции.
+
+    Запрос, пришедший до коммита, успевает закешировать прежние данные
+    уже под новой версией; без второго сброса они жили бы до истечения
+    PAGE_CACHE_TIMEOUT. Первый сброс нужен тем, кто читает внутри той
+    же транзакции.
+    """
+    bump(*scopes)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: bump(*scopes))
+
+
+def record(name, event):
+    """Учитывает событие event ('hit', 'miss', 'stale') кеша name.
+
+    Записывается одно событие из CACHE_STATS_SAMPLE (с весом
+    CACHE_STATS_SAMPLE): обычное попадание не ходит в кеш за счётчиком.
+    """
+    rate = settings.CACHE_STATS_SAMPLE
+    if rate > 1 and random.random() * rate >= 1:
+        return
+    key = STATS_KEY.format(name, event)
+    try:
+        cache.incr(key, rate)
+    except ValueError:
+        cache.set(key, rate, None)
+        names = cache.get(STATS_NAMES_KEY) or set()
+        if name not in names:
+            cache.set(STATS_NAMES_KEY, names | {name}, None)
+
+
+def stats():
+    """Оценки счётчиков по именам закешированных страниц и фрагментов."""
+    keys = {
+        (name, event): STATS_KEY.format(name, event)
+        for name in cache.get(STATS_NAMES_KEY) or () for event in EVENTS
+    }
+    values = cache.get_many(keys.values())
+    result = {}
+    for (name, event), key in sorted(keys.items()):
+        result.setdefault(name, {})[event] = values.get(key, 0)
+    return result
+
+
+def _wait_for(key, tag):
+    """Ждёт, пока значение key с меткой tag посчитает другой процесс."""
+    deadline = time.monotonic() + settings.CACHE_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(0.05)
+        entry = cache.get(key)
+        if entry is not None and entry[2] == tag:
+            return entry
+    return None
+
+
+def _compute(compute):
+    """compute() и признак, что внутри него отдано устаревшее значение."""
+    stack = _computing.__dict__.setdefault('stack', [])
+    stack.append(False)
+    try:
+        value = compute()
+    finally:
+        stale = stack.pop()
+    return value, stale
+
+
+def _mark_stale():
+    """Отмечает, что объемлющий пересчёт собран из устаревшего."""
+    stack = getattr(_computing, 'stack', None)
+    if stack:
+        stack[-1] = True
+
+
+def _computed(name, stale):
+    """Событие пересчитанного значения для get_or_refresh."""
+    if not stale:
+        record(name, MISS)
+        return MISS
+    record(name, STALE)
+    _mark_stale()
+    return STALE
+
+
+def get_or_refresh(key, compute, name, timeout, tag=None):
+    """Значение key из кеша с мягким сроком и защитой от лавины.
+
+    Запись свежая timeout секунд и с той же меткой tag (например,
+    версиями областей), после этого — устаревшая ещё
+    CACHE_STALE_TIMEOUT секунд. Пересчитывает её один процесс, взявший
+    блокировку в кеше; остальные отдают устаревшую запись, а без неё
+    ждут результата до CACHE_LOCK_WAIT секунд. Сессии, закреплённые
+    после записи (core.replicas), устаревшее не получают.
+
+    compute возвращает значение; None не кешируется. Результат —
+    (значение, событие), событие STALE значит, что значение устарело.
+    Устаревшее, отданное вложенному вызову (фрагмент внутри страницы),
+    делает устаревшим и внешнее значение: оно кешируется уже истёкшим
+    и пересчитывается следующим запросом.
+    """
+    entry = cache.get(key)
+    if entry is not None and entry[2] == tag and entry[1] > time.time():
+        record(name, HIT)
+        return entry[0], HIT
+    lock = LOCK_KEY.format(key)
+    if cache.add(lock, 1, settings.CACHE_LOCK_TIMEOUT):
+        try:
+            value, stale = _compute(compute)
+            if value is not None:
+                fresh_until = 0 if stale else time.time() + timeout
+                cache.set(key, (value, fresh_until, tag),
+                          timeout + settings.CACHE_STALE_TIMEOUT)
+        finally:
+            cache.delete(lock)
+        return value, _computed(name, stale)
+    if entry is not None and not use_primary():
+        record(name, STALE)
+        _mark_stale()
+        return entry[0], STALE
+    if entry is None:
+        entry = _wait_for(key, tag)
+        if entry is not None:
+            event = HIT if entry[1] > time.time() else STALE
+            record(name, event)
+            if event == STALE:
+                _mark_stale()
+            return entry[0], event
+    value, stale = _compute(compute)
+    return value, _computed(name, stale)
+
+
+def page_key(path):
+    return PAGE_KEY.format(hashlib.md5(path.encode()).hexdigest())
+
+
+def versioned_cache_page(*scopes, timeout=None):
+    """Кеш страниц, устаревающих при смене версий их областей.
+
+    Области задаются строками-шаблонами по аргументам представления,
+    например 'group:{slug}'. Страница живёт в кеше до изменения данных
+    (см. signals.py), а не до истечения короткого TTL; после изменения
+    её пересчитывает один запрос, остальные пока получают прежнюю
+    (get_or_refresh).
+
+    Тело страницы общее для всех посетителей: фрагменты, зависящие от
+    пользователя ({% hole %}), кешируются метками и заполняются при
+    каждом ответе (holes.py) — только у страниц, где шаблон их оставил.
+
+    Валидаторы строятся по отданному телу, поэтому попадание в кеш и
+    ответ 304 не делают запросов к базе сверх нужных дыркам. ETag —
+    хеш заполненного тела; Last-Modified — время рендеринга, только у
+    страниц без дырок: их тело не зависит от пользователя.
+    """
+    def decorator(view):
+        stats_name = f'page:{view.__module__}.{view.__name__}'
+
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            if request.method not in ('GET', 'HEAD'):
+                return view(request, *args, **kwargs)
+            names = [scope.format(**kwargs) for scope in scopes]
+            versions = '.'.join(
+                f'{name}={version}'
+                for name, version in zip(names, get_versions(*names))
+            )
+            rendered = []
+
+            def render():
+                holes.punch(request)
+                try:
+                    response = view(request, *args, **kwargs)
+                finally:
+                    request.punch_holes = False
+                rendered.append(response)
+                if (response.status_code != 200 or response.streaming
+                        or response.cookies):
+                    return None
+                # Дырки заполняются только там, где их оставил шаблон:
+                # в остальных ответах (JSON API) похожий текст — данные.
+                return (response.content.decode(response.charset),
+                        response['Content-Type'], time.time(),
+                        request.holes_punched)
+
+            cached, event = get_or_refresh(
+                page_key(request.get_full_path()), render, stats_name,
+                timeout or settings.PAGE_CACHE_TIMEOUT, tag=versions,
+            )
+            if cached is None:
+                return rendered[0]
+            content, content_type, rendered_at, punched = cached
+            response = (rendered[0] if rendered
+                        else HttpResponse(content, content_type=content_type))
+            last_modified = None
+            if punched:
+                response.content = holes.fill(request, content)
+            else:
+                last_modified = int(rendered_at)
+                response['Last-Modified'] = http_date(last_modified)
+            response['ETag'] = quote_etag(
+                hashlib.md5(response.content).hexdigest()
+            )
+            if event == STALE:
+                # Устаревшее тело: клиент не должен считать его свежим.
+                response['Cache-Control'] = 'no-cache'
+            return get_conditional_response(
+                request, etag=response['ETag'], last_modified=last_modified,
+                response=response,
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,77 @@
+import hashlib
+
+from django.db.models import Max, OuterRef, Subquery
+from django.views.decorators.http import condition
+
+from . import caching, timeline
+from .models import Comment, Post
+
+
+def conditional_page(state):
+    """Отвечает 304 Not Modified, пока состояние страницы не изменилось.
+
+    Для страниц без кеша: versioned_cache_page (caching.py) сам строит
+    валидаторы по закешированному телу, не обращаясь к базе.
+
+    state(request, **kwargs) возвращает (last_modified, token): время
+    последнего изменения данных страницы и то, что им не покрывается
+    (удаления, счётчики). Оба валидатора строятся из одного вызова
+    state, ETag дополнительно зависит от пользователя: страница
+    авторизованного показывает его меню и кнопки.
+    """
+    def get_state(request, **kwargs):
+        if not hasattr(request, '_page_state'):
+            request._page_state = state(request, **kwargs)
+        return request._page_state
+
+    def etag(request, **kwargs):
+        last_modified, token = get_state(request, **kwargs)
+        if last_modified is None and token is None:
+            # Страницы нет (404) или она не для этого пользователя.
+            return None
+        raw = f'{request.user.pk}:{last_modified}:{token}'
+        return hashlib.md5(raw.encode()).hexdigest()
+
+    def last_modified(request, **kwargs):
+        return get_state(request, **kwargs)[0]
+
+    return condition(etag_func=etag, last_modified_func=last_modified)
+
+
+def latest(*values):
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def _newest(queryset, field):
+    """Подзапрос ORDER BY field DESC LIMIT 1 — один поиск по индексу."""
+    return Subquery(queryset.order_by(f'-{field}').values(field)[:1])
+
+
+def post_state(request, post_id):
+    row = Post.objects.filter(pk=post_id).annotate(
+        last_comment=_newest(
+            Comment.objects.filter(post=OuterRef('pk')), 'created'
+        )
+    ).values(
+        'updated', 'last_comment', 'comments_count', 'author__stats__updated',
+        'author__stats__posts_count',
+    ).first()
+    if row is None:
+        return None, None
+    return (
+        latest(row['updated'], row['last_comment'],
+               row['author__stats__updated']),
+        (row['comments_count'], row['author__stats__posts_count']),
+    )
+
+
+def follow_state(request):
+    if not request.user.is_authenticated:
+        return None, None
+    last = timeline.timeline_posts(request.user).aggregate(
+        last=Max('updated')
+    )['last']
+    return last, caching.get_versions(
+        f'profile:{request.user.username}', 'suggestions'
+    )
@@ -0,0 +1,109 @@
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Comment, Follow, Group, Post, User, UserStats
+
+
+def _count(queryset, field):
+    """Подзапрос COUNT(*) по внешнему ключу field для update()."""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def _user_counts(user_id):
+    return {
+        'posts_count': Post.objects.filter(author_id=user_id).count(),
+        'followers_count': Follow.objects.filter(author_id=user_id).count(),
+        'following_count': Follow.objects.filter(user_id=user_id).count(),
+    }
+
+
+def bump_user(user_id, **deltas):
+    """Атомарно сдвигает счётчики пользователя на deltas."""
+    if user_id is None:
+        return
+    updated = UserStats.objects.filter(user_id=user_id).update(
+        updated=timezone.now(),
+        **{name: F(name) + delta for name, delta in deltas.items()}
+    )
+    if not updated and all(delta > 0 for delta in deltas.values()):
+        # Записи ещё нет: считаем с нуля, изменение уже в базе.
+        # При уменьшении запись не создаём — пользователь может
+        # удаляться каскадом вместе со своими счётчиками.
+        UserStats.objects.get_or_create(
+            user_id=user_id, defaults=_user_counts(user_id)
+        )
+
+
+def bump_group(group_id, delta):
+    if group_id is not None:
+        Group.objects.filter(pk=group_id).update(
+            posts_count=F('posts_count') + delta
+        )
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comments_count=F('comments_count') + delta
+    )
+
+
+def user_stats(user):
+    """Счётчики пользователя; создаёт недостающую запись."""
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        stats, _ = UserStats.objects.get_or_create(
+            user_id=user.pk, defaults=_user_counts(user.pk)
+        )
+        return stats
+
+
+def recount(users=None, groups=None, posts=None):
+    """Пересчитывает счётчики несколькими UPDATE ... SELECT.
+
+    users, groups и posts — querysets с первичными ключами (values('pk'))
+    тех записей, которые нужно пересчитать; None — все записи.
+    """
+    user_rows = User.objects.all()
+    stats = UserStats.objects.all()
+    group_rows = Group.objects.all()
+    post_rows = Post.objects.all()
+    if users is not None:
+        user_rows = user_rows.filter(pk__in=users)
+        stats = stats.filter(user_id__in=users)
+    if groups is not None:
+        group_rows = group_rows.filter(pk__in=groups)
+    if posts is not None:
+        post_rows = post_rows.filter(pk__in=posts)
+    missing = user_rows.filter(stats__isnull=True).values_list(
+        'pk', flat=True
+    )
+    UserStats.objects.bulk_create(
+        [UserStats(user_id=pk) for pk in missing],
+        batch_size=500,
+    )
+    stats.update(
+        posts_count=_count(Post.objects.all(), 'author'),
+    )
+    stats.update(
+        followers_count=_count(Follow.objects.all(), 'author'),
+    )
+    stats.update(
+        following_count=_count(Follow.objects.all(), 'user'),
+    )
+    group_rows.update(posts_count=_count(Post.objects.all(), 'group'))
+    post_rows.update(comments_count=_count(Comment.objects.all(), 'post'))
+
+
+def recount_all():
+    recount()
@@ -0,0 +1,71 @@
+import csv
+import json
+
+from django.conf import settings
+
+from .models import Comment, Post
+
+IMAGE_STORAGE = Post._meta.get_field('image').storage
+CSV_COLUMNS = (
+    'type', 'id', 'post_id', 'group', 'text', 'date', 'updated', 'image',
+    'image_url',
+)
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+def export_rows(user):
+    """Посты и комментарии пользователя словарями, по одному.
+
+    Строки читаются через values().iterator(chunk_size): в памяти
+    не больше EXPORT_CHUNK_SIZE строк, сколько бы их ни было у автора.
+    """
+    chunk_size = settings.EXPORT_CHUNK_SIZE
+    posts = Post.objects.filter(author=user).order_by('pk').values(
+        'id', 'text', 'pub_date', 'updated', 'group__slug', 'image'
+    )
+    for post in posts.iterator(chunk_size=chunk_size):
+        yield {
+            'type': 'post',
+            'id': post['id'],
+            'group': post['group__slug'],
+            'text': post['text'],
+            'date': post['pub_date'].isoformat(),
+            'updated': post['updated'].isoformat(),
+            'image': post['image'] or None,
+            'image_url': (IMAGE_STORAGE.url(post['image'])
+                          if post['image'] else None),
+        }
+    comments = Comment.objects.filter(author=user).order_by('pk').values(
+        'id', 'post_id', 'text', 'created'
+    )
+    for comment in comments.iterator(chunk_size=chunk_size):
+        yield {
+            'type': 'comment',
+            'id': comment['id'],
+            'post_id': comment['post_id'],
+            'text': comment['text'],
+            'date': comment['created'].isoformat(),
+        }
+
+
+class Echo:
+    """Файл для csv.writer, который отдаёт строку, а не пишет её."""
+
+    def write(self, value):
+        return value
+
+
+def export_lines(user, format):
+    """Строки экспорта в формате 'ndjson' или 'csv'."""
+    rows = export_rows(user)
+    if format == 'ndjson':
+        for row in rows:
+            yield json.dumps(row, ensure_ascii=False) + '\n'
+        return
+    writer = csv.DictWriter(Echo(), fieldnames=CSV_COLUMNS)
+    yield writer.writeheader()
+    for row in rows:
+        yield writer.writerow(row)
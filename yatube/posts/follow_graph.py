@@ -0,0 +1,125 @@
+import itertools
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from scipy import sparse
+
+from . import caching
+from .models import Follow, FollowSuggestion
+
+# Вес «друзей друзей» (подписки тех, на кого подписан пользователь)
+# относительно похожести авторов по общим подписчикам.
+FRIENDS_WEIGHT = 1.0
+CO_FOLLOW_WEIGHT = 1.0
+WRITE_BATCH = 5000
+
+
+def follow_matrix():
+    """Граф подписок: (ids, A), где A[i, j] = 1, если ids[i] читает ids[j].
+
+    Пользователи без подписок и подписчиков в матрицу не попадают.
+    """
+    pairs = Follow.objects.filter(
+        user__isnull=False, author__isnull=False
+    ).values_list('user_id', 'author_id').order_by()
+    edges = np.fromiter(
+        (pk for pair in pairs.iterator() for pk in pair), dtype=np.int64
+    ).reshape(-1, 2)
+    ids, index = np.unique(edges, return_inverse=True)
+    index = index.reshape(-1, 2)
+    size = len(ids)
+    matrix = sparse.csr_matrix(
+        (np.ones(len(index), dtype=np.float32), (index[:, 0], index[:, 1])),
+        shape=(size, size),
+    )
+    # Повторная подписка на того же автора не должна удваивать вес.
+    matrix.data[:] = 1
+    return ids, matrix
+
+
+def normalize_columns(matrix):
+    """Столбцы матрицы подписок, делённые на их норму.
+
+    Скалярное произведение двух столбцов — косинусная похожесть
+    авторов по общим подписчикам.
+    """
+    followers = np.asarray(matrix.sum(axis=0)).ravel()
+    norm = sparse.diags(
+        np.divide(1, np.sqrt(followers), out=np.zeros_like(followers),
+                  where=followers > 0)
+    )
+    return (matrix @ norm).tocsr()
+
+
+def co_follow_scores(block, normalized):
+    """Оценки block @ S, где S — похожесть авторов (normalized.T @ normalized).
+
+    S целиком не строится: блок сначала умножается на normalized.T, и
+    память ограничена размером блока. Похожесть автора на самого себя не
+    вычитается: она попадает только в уже прочитанных авторов, а их
+    отбрасывает top_k.
+    """
+    return (block @ normalized.T) @ normalized
+
+
+def top_k(scores, follows, offset, k):
+    """Лучшие k кандидатов каждой строки блока scores.
+
+    Уже прочитанные авторы и сам пользователь отбрасываются.
+    """
+    scores = scores.tocsr()
+    scores = scores - scores.multiply(follows)
+    for row in range(scores.shape[0]):
+        start, end = scores.indptr[row], scores.indptr[row + 1]
+        columns = scores.indices[start:end]
+        values = scores.data[start:end]
+        keep = (values > 0) & (columns != offset + row)
+        columns, values = columns[keep], values[keep]
+        if len(values) > k:
+            best = np.argpartition(-values, k)[:k]
+            columns, values = columns[best], values[best]
+        order = np.lexsort((columns, -values))
+        yield row, columns[order], values[order]
+
+
+def build(k=None, block_size=None):
+    """Пересчитывает FollowSuggestion для всех пользователей графа.
+
+    Матрицы перемножаются блоками по block_size строк, чтобы оценки
+    кандидатов не занимали память на весь граф сразу; результат копится
+    в массивах numpy и записывается одной транзакцией.
+    Возвращает число записанных рекомендаций.
+    """
+    k = k or settings.FOLLOW_SUGGESTIONS
+    block_size = block_size or settings.FOLLOW_SUGGESTIONS_BLOCK_SIZE
+    ids, matrix = follow_matrix()
+    normalized = normalize_columns(matrix)
+    users, authors, ranks, values = [], [], [], []
+    for offset in range(0, len(ids), block_size):
+        block = matrix[offset:offset + block_size]
+        scores = (FRIENDS_WEIGHT * (block @ matrix)
+                  + CO_FOLLOW_WEIGHT * co_follow_scores(block, normalized))
+        for row, columns, row_values in top_k(scores, block, offset, k):
+            users.append(np.full(len(columns), ids[offset + row]))
+            authors.append(ids[columns])
+            ranks.append(np.arange(len(columns)))
+            values.append(row_values)
+    if users:
+        users, authors, ranks, values = (
+            np.concatenate(array) for array in (users, authors, ranks, values)
+        )
+    rows = (
+        FollowSuggestion(user_id=int(user), author_id=int(author),
+                         rank=int(rank), score=float(value))
+        for user, author, rank, value in zip(users, authors, ranks, values)
+    )
+    with transaction.atomic():
+        FollowSuggestion.objects.all().delete()
+        while True:
+            batch = list(itertools.islice(rows, WRITE_BATCH))
+            if not batch:
+                break
+            FollowSuggestion.objects.bulk_create(batch)
+    caching.bump('suggestions')
+    return len(users)
@@ -0,0 +1,95 @@
+import hashlib
+import re
+from urllib.parse import parse_qsl, urlencode
+
+from django.conf import settings
+from django.template.loader import render_to_string
+
+from . import suggestions
+from .forms import CommentForm
+from .models import Follow
+
+# Метку нельзя подделать текстом поста: в ней секрет развёртывания.
+NONCE = hashlib.sha256(
+    f'holes:{settings.SECRET_KEY}'.encode()
+).hexdigest()[:16]
+MARKER_PREFIX = f'<!--hole:{NONCE}:'
+MARKER = MARKER_PREFIX + '{}?{}-->'
+MARKER_RE = re.compile(re.escape(MARKER_PREFIX) + r'([\w-]+)\?([^>]*)-->')
+
+# Имя дырки -> (шаблон, функция контекста(request, **params)).
+HOLES = {}
+
+
+def hole(name, template):
+    """Регистрирует фрагмент страницы, который зависит от пользователя."""
+    def decorator(get_context):
+        HOLES[name] = (template, get_context)
+        return get_context
+    return decorator
+
+
+def punch(request):
+    """Следующий рендеринг оставит вместо фрагментов метки (см. fill)."""
+    request.punch_holes = True
+    request.holes_punched = False
+
+
+def marker(request, name, params):
+    """Метка фрагмента; отмечает, что в теле ответа есть дырки."""
+    request.holes_punched = True
+    return MARKER.format(name, urlencode(params))
+
+
+def render(request, name, params):
+    template, get_context = HOLES[name]
+    context = get_context(request, **params)
+    return render_to_string(template, context, request=request)
+
+
+def fill(request, content):
+    """Подставляет в общее для всех тело страницы фрагменты request.
+
+    Одинаковые дырки рендерятся один раз.
+    """
+    rendered = {}
+
+    def replace(match):
+        if match.group(0) not in rendered:
+            params = dict(parse_qsl(match.group(2)))
+            rendered[match.group(0)] = render(request, match.group(1),
+                                              params)
+        return rendered[match.group(0)]
+
+    return MARKER_RE.sub(replace, content)
+
+
+@hole('header', 'includes/header.html')
+def header(request):
+    return {}
+
+
+@hole('switcher', 'posts/includes/switcher.html')
+def switcher(request, active=''):
+    return {active: True} if active else {}
+
+
+@hole('follow_button', 'posts/includes/follow_button.html')
+def follow_button(request, username):
+    following = (
+        request.user.is_authenticated and Follow.objects.filter(
+            user=request.user,
+            author__username=username
+        ).exists()
+    )
+    return {'username': username, 'following': following}
+
+
+@hole('suggestions', 'posts/includes/suggestions.html')
+def follow_suggestions(request):
+    return {'suggestions': suggestions.suggestions_for(request.user)}
+
+
+@hole('comment_form', 'posts/includes/comment_form.html')
+def comment_form(request, post_id):
+    return {'post_id': post_id, 'form': CommentForm()}
@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posts import follow_graph
+
+
+class Command(BaseCommand):
+    help = ('Пересчитывает рекомендации «на кого подписаться» по графу '
+            'подписок')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--top-k', type=int,
+                            help='Рекомендаций на пользователя')
+        parser.add_argument('--block-size', type=int,
+                            help='Строк матрицы подписок за один проход')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        count = follow_graph.build(options['top_k'], options['block_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Рекомендаций: {count} за '
+            f'{time.perf_counter() - started:.1f} с'
+        ))
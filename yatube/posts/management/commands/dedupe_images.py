@@ -0,0 +1,44 @@
+import re
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from posts.models import ImageBlob, Post
+
+BLOB_NAME = re.compile(r'/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+
+
+class Command(BaseCommand):
+    help = ('Переносит картинки постов в хранилище по хешу содержимого '
+            'и пересчитывает ссылки на файлы')
+
+    def handle(self, *args, **options):
+        storage = Post._meta.get_field('image').storage
+        names = (
+            Post.objects.exclude(image='')
+            .values_list('image', flat=True)
+            .distinct()
+            .order_by()
+        )
+        moved = 0
+        for name in list(names):
+            if BLOB_NAME.search(name) or not storage.exists(name):
+                continue
+            with storage.open(name) as source:
+                blob = storage.save(name, source)
+            with transaction.atomic():
+                Post.objects.filter(image=name).update(image=blob)
+            storage.delete(name)
+            moved += 1
+        with transaction.atomic():
+            ImageBlob.objects.all().delete()
+            ImageBlob.objects.bulk_create(
+                ImageBlob(name=row['image'], refs=row['refs'])
+                for row in Post.objects.exclude(image='')
+                .values('image').annotate(refs=Count('pk')).order_by()
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Перенесено файлов: {moved}, '
+            f'уникальных картинок: {ImageBlob.objects.count()}'
+        ))
@@ -0,0 +1,37 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import CONTENT_TYPES, export_lines
+from posts.models import User
+
+
+class Command(BaseCommand):
+    help = 'Выгружает посты и комментарии пользователя в NDJSON или CSV'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username')
+        parser.add_argument('--format', choices=sorted(CONTENT_TYPES),
+                            default='ndjson')
+        parser.add_argument('--output', help='Файл; по умолчанию stdout')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(
+                f'Пользователь {options["username"]} не найден'
+            )
+        lines = export_lines(user, options['format'])
+        if not options['output']:
+            self.write(lines, self.stdout)
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as file:
+            count = self.write(lines, file)
+        self.stderr.write(f'Записано строк: {count}')
+
+    def write(self, lines, file):
+        count = 0
+        for line in lines:
+            file.write(line)
+            count += 1
+        return count
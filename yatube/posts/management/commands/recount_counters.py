@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.counters import recount_all
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает денормализованные счётчики постов и подписок'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            recount_all()
+        self.stdout.write(self.style.SUCCESS('Счётчики пересчитаны'))
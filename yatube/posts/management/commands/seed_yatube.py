@@ -0,0 +1,195 @@
+import bisect
+import datetime as dt
+import itertools
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from posts import counters, timeline
+from posts.models import Comment, Follow, Group, Post, User
+
+# Фиксированная точка отсчёта, чтобы набор зависел только от seed.
+SEED_UNTIL = dt.datetime(2021, 9, 15, tzinfo=timezone.utc)
+SEED_PASSWORD = 'yatube-seed'
+
+
+def zipf_weights(size, exponent):
+    """Накопленные веса распределения Ципфа для ранга 1..size."""
+    return list(itertools.accumulate(
+        1 / rank ** exponent for rank in range(1, size + 1)
+    ))
+
+
+def next_pk(model):
+    return (model.objects.aggregate(pk=Max('pk'))['pk'] or 0) + 1
+
+
+@contextmanager
+def manual_dates(*fields):
+    """Отключает auto_now_add, чтобы bulk_create сохранил свои даты."""
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field in fields:
+            field.auto_now_add = True
+
+
+class Command(BaseCommand):
+    help = 'Заполняет базу синтетическими данными с реалистичным перекосом'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--groups', type=int, default=50)
+        parser.add_argument('--posts', type=int, default=20000)
+        parser.add_argument('--comments', type=int, default=50000)
+        parser.add_argument('--follows', type=int, default=20000)
+        parser.add_argument('--days', type=int, default=365)
+        parser.add_argument('--zipf', type=float, default=1.1,
+                            help='Показатель распределения Ципфа')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--batch-size', type=int, default=2000)
+        parser.add_argument('--no-timelines', action='store_true',
+                            help='Не пересобирать ленты подписок')
+
+    def handle(self, *args, **options):
+        self.rnd = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.zipf = options['zipf']
+        self.since = SEED_UNTIL - dt.timedelta(days=options['days'])
+
+        users = self.seed_users(options['users'])
+        groups = self.seed_groups(options['groups'])
+        self.seed_follows(users, options['follows'])
+        posts = self.seed_posts(users, groups, options['posts'])
+        self.seed_comments(users, posts, options['comments'])
+
+        self.stdout.write('Пересчёт счётчиков...')
+        with transaction.atomic():
+            counters.recount_all()
+        if not options['no_timelines']:
+            self.stdout.write('Пересборка лент...')
+            timeline.rebuild()
+        self.stdout.write(self.style.SUCCESS('Готово'))
+
+    def save(self, model, objects):
+        """Пишет объекты пачками, каждая пачка — отдельная транзакция."""
+        total = 0
+        objects = iter(objects)
+        while True:
+            batch = list(itertools.islice(objects, self.batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                model.objects.bulk_create(batch)
+            total += len(batch)
+        self.stdout.write(f'{model.__name__}: {total}')
+
+    def zipf_sampler(self, population):
+        """Выбор из population: первые элементы — самые популярные."""
+        weights = zipf_weights(len(population), self.zipf)
+        top = weights[-1]
+        return lambda: population[
+            bisect.bisect(weights, self.rnd.random() * top)
+        ]
+
+    def seed_users(self, count):
+        start = next_pk(User)
+        password = make_password(SEED_PASSWORD)
+        self.save(User, (
+            User(pk=pk, username=f'user{pk}', password=password,
+                 first_name=f'Имя{pk}', last_name=f'Фамилия{pk}',
+                 date_joined=self.since)
+            for pk in range(start, start + count)
+        ))
+        users = list(range(start, start + count))
+        self.rnd.shuffle(users)
+        return users
+
+    def seed_groups(self, count):
+        start = next_pk(Group)
+        self.save(Group, (
+            Group(pk=pk, title=f'Группа {pk}', slug=f'group-{pk}',
+                  description=f'Описание группы {pk}')
+            for pk in range(start, start + count)
+        ))
+        return list(range(start, start + count))
+
+    def seed_follows(self, users, count):
+        author = self.zipf_sampler(users)
+        pairs = set()
+        attempts = 0
+        while len(pairs) < count and attempts < count * 10:
+            attempts += 1
+            user_id, author_id = self.rnd.choice(users), author()
+            if user_id != author_id:
+                pairs.add((user_id, author_id))
+        self.save(Follow, (
+            Follow(user_id=user_id, author_id=author_id)
+            for user_id, author_id in sorted(pairs)
+        ))
+
+    def burst_dates(self, count):
+        """Даты публикаций: большая часть постов идёт всплесками."""
+        span = (SEED_UNTIL - self.since).total_seconds()
+        bursts = [
+            self.rnd.random() * span for _ in range(max(1, count // 200))
+        ]
+        for _ in range(count):
+            if self.rnd.random() < 0.7:
+                offset = self.rnd.choice(bursts) + self.rnd.expovariate(
+                    1 / 3600
+                )
+            else:
+                offset = self.rnd.random() * span
+            yield self.since + dt.timedelta(seconds=min(offset, span))
+
+    def seed_posts(self, users, groups, count):
+        start = next_pk(Post)
+        author = self.zipf_sampler(users)
+        group = self.zipf_sampler(groups) if groups else lambda: None
+        dates = sorted(self.burst_dates(count))
+        posts = []
+
+        def build():
+            for pk, pub_date in zip(range(start, start + count), dates):
+                posts.append((pk, pub_date))
+                yield Post(
+                    pk=pk, text=f'Синтетический пост {pk}',
+                    author_id=author(), pub_date=pub_date,
+                    group_id=group() if self.rnd.random() < 0.5 else None,
+                )
+
+        with manual_dates(Post._meta.get_field('pub_date')):
+            self.save(Post, build())
+        return posts
+
+    def seed_comments(self, users, posts, count):
+        if not posts:
+            return
+        start = next_pk(Comment)
+        # Свежие посты обсуждают чаще: ранжируем от новых к старым.
+        post = self.zipf_sampler(posts[::-1])
+
+        def build():
+            for pk in range(start, start + count):
+                post_id, pub_date = post()
+                created = min(
+                    pub_date + dt.timedelta(
+                        seconds=self.rnd.expovariate(1 / 7200)
+                    ),
+                    SEED_UNTIL,
+                )
+                yield Comment(
+                    pk=pk, text=f'Комментарий {pk}', post_id=post_id,
+                    author_id=self.rnd.choice(users), created=created,
+                )
+
+        with manual_dates(Comment._meta.get_field('created')):
+            self.save(Comment, build())
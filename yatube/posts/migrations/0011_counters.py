@@ -0,0 +1,84 @@
+# Generated by Django 2.2.16 on 2026-10-18 16:40
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def _count(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total')
+        ),
+        0
+    )
+
+
+def fill_counters(apps, schema_editor):
+    """Заполняет новые счётчики по существующим данным.
+
+    Иначе они остаются нулями: group_posts показывает пустой пейджинатор,
+    а удаление поста или комментария уводит счётчик ниже нуля (CHECK).
+    """
+    db = schema_editor.connection.alias
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    UserStats = apps.get_model('posts', 'UserStats')
+    Group = apps.get_model('posts', 'Group')
+    Post = apps.get_model('posts', 'Post')
+    Comment = apps.get_model('posts', 'Comment')
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats.objects.using(db).bulk_create(
+        [
+            UserStats(user_id=pk)
+            for pk in User.objects.using(db).values_list('pk', flat=True)
+        ],
+        batch_size=500,
+    )
+    UserStats.objects.using(db).update(
+        posts_count=_count(Post.objects.using(db), 'author'),
+        followers_count=_count(Follow.objects.using(db), 'author'),
+        following_count=_count(Follow.objects.using(db), 'user'),
+    )
+    Group.objects.using(db).update(
+        posts_count=_count(Post.objects.using(db), 'group')
+    )
+    Post.objects.using(db).update(
+        comments_count=_count(Comment.objects.using(db), 'post')
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0011_update_proxy_permissions'),
+        ('posts', '0010_timelineentry'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('posts_count', models.PositiveIntegerField(default=0)),
+                ('followers_count', models.PositiveIntegerField(default=0)),
+                ('following_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='group',
+            name='posts_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='post',
+            name='comments_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(fill_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 2.2.16 on 2026-10-18 17:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0015_comment_post_created'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='userstats',
+            name='updated',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['updated'], name='posts_post_updated_c58def_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['group', 'updated'], name='posts_post_group_i_7ae3e8_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='post',
+            index=models.Index(fields=['author', 'updated'], name='posts_post_author__179e84_idx'),
+        ),
+    ]
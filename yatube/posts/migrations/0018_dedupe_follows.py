@@ -0,0 +1,58 @@
+from django.db import migrations, transaction
+from django.db.models import Count, Min
+
+# Пар (подписчик, автор) в одной транзакции: большая таблица не
+# держит блокировку записи всё время миграции.
+CHUNK_SIZE = 1000
+
+
+def dedupe_follows(apps, schema_editor):
+    """Оставляет по одной (самой ранней) подписке на пару user, author.
+
+    Перед unique_together в 0019: иначе создание индекса упадёт на
+    накопившихся дублях. Счётчики подписок затронутых пользователей
+    пересчитываются.
+    """
+    Follow = apps.get_model('posts', 'Follow')
+    UserStats = apps.get_model('posts', 'UserStats')
+    db = schema_editor.connection.alias
+    duplicates = (
+        Follow.objects.using(db)
+        .filter(user__isnull=False, author__isnull=False)
+        .values('user_id', 'author_id')
+        .annotate(keep=Min('pk'), total=Count('pk'))
+        .filter(total__gt=1)
+        .order_by()
+    )
+    while True:
+        with transaction.atomic(using=db):
+            chunk = list(duplicates[:CHUNK_SIZE])
+            for pair in chunk:
+                Follow.objects.using(db).filter(
+                    user_id=pair['user_id'], author_id=pair['author_id']
+                ).exclude(pk=pair['keep']).delete()
+            for user_id in {pair['user_id'] for pair in chunk}:
+                UserStats.objects.using(db).filter(user_id=user_id).update(
+                    following_count=Follow.objects.using(db)
+                    .filter(user_id=user_id).count()
+                )
+            for author_id in {pair['author_id'] for pair in chunk}:
+                UserStats.objects.using(db).filter(user_id=author_id).update(
+                    followers_count=Follow.objects.using(db)
+                    .filter(author_id=author_id).count()
+                )
+        if len(chunk) < CHUNK_SIZE:
+            break
+
+
+class Migration(migrations.Migration):
+    # Каждая пачка фиксируется своей транзакцией.
+    atomic = False
+
+    dependencies = [
+        ('posts', '0017_followsuggestion'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_follows, migrations.RunPython.noop),
+    ]
@@ -1,21 +1,72 @@
 from django.contrib.auth import get_user_model
 from django.db import models
 
+from .storage import ContentAddressedStorage
+
 User = get_user_model()
 
 
-class Group(models.Model):
+class CountersMixin:
+    """Не даёт save() затереть счётчики устаревшими значениями.
+
+    Счётчики меняются только через F() в signals.py, поэтому при
+    обновлении существующей записи они исключаются из update_fields.
+    """
+    counter_fields = ()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            skip = set(self.counter_fields) | self.get_deferred_fields()
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.attname not in skip
+                and field.name not in skip
+            ]
+        super().save(*args, **kwargs)
+
+
+class Group(CountersMixin, models.Model):
     title = models.CharField(max_length=200)
     slug = models.SlugField(unique=True)
     description = models.TextField()
+    posts_count = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = ('posts_count',)
 
     def __str__(self):
         return self.title
 
 
-class Post(models.Model):
+class PostQuerySet(models.QuerySet):
+    # Колонки, которые карточки ленты не показывают.
+    FEED_DEFERRED = (
+        'author__password',
+        'author__last_login',
+        'author__is_superuser',
+        'author__email',
+        'author__is_staff',
+        'author__is_active',
+        'author__date_joined',
+        'group__description',
+    )
+
+    def for_feed(self):
+        """Посты для списков: автор и группа подгружаются JOIN-ом.
+
+        Бюджет запросов страницы ленты (index, group_list, profile,
+        follow_index) не зависит от числа постов на странице: один
+        SELECT постов плюс запросы самого представления (группа или
+        автор, сессия и пользователь для авторизованных).
+        """
+        return self.select_related('author', 'group').defer(
+            *self.FEED_DEFERRED
+        )
+
+
+class Post(CountersMixin, models.Model):
     text = models.TextField()
     pub_date = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated = models.DateTimeField(auto_now=True)
     author = models.ForeignKey(
         User,
         on_delete=models.CASCADE,
@@ -30,11 +81,26 @@ class Post(models.Model):
     image = models.ImageField(
         'Картинка',
         upload_to='posts/',
+        storage=ContentAddressedStorage(),
         blank=True
     )
+    comments_count = models.PositiveIntegerField(default=0, editable=False)
+
+    counter_fields = ('comments_count',)
+
+    objects = PostQuerySet.as_manager()
 
     class Meta:
         ordering = ['-pub_date']
+        # Ленты автора и группы: поиск и сортировка одним индексом.
+        # Для Last-Modified лент: MAX(updated) одним поиском по индексу.
+        indexes = [
+            models.Index(fields=['author', '-pub_date']),
+            models.Index(fields=['group', '-pub_date']),
+            models.Index(fields=['updated']),
+            models.Index(fields=['group', 'updated']),
+            models.Index(fields=['author', 'updated']),
+        ]
 
     def __str__(self):
         return self.text
@@ -54,6 +120,11 @@ class Comment(models.Model):
         related_name='comments'
     )
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['post', 'created']),
+        ]
+
     def __str__(self) -> str:
         return self.text
 
@@ -70,4 +141,81 @@ class Follow(models.Model):
         on_delete=models.CASCADE,
         related_name='following',
         blank=True, null=True
-    )
\ No newline at end of file
+    )
+
+    class Meta:
+        unique_together = ('user', 'author')
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, обновляемые при записи (см. signals.py)."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats'
+    )
+    posts_count = models.PositiveIntegerField(default=0)
+    followers_count = models.PositiveIntegerField(default=0)
+    following_count = models.PositiveIntegerField(default=0)
+    updated = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f'{self.user_id}: {self.posts_count} posts'
+
+
+class ImageBlob(models.Model):
+    """Файл картинки в хранилище и число постов, которые на него ссылаются."""
+    name = models.CharField(max_length=255, unique=True)
+    refs = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return self.name
+
+
+class TimelineEntry(models.Model):
+    """Пост в ленте подписчика, разложенный при публикации (fan-out)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline'
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline_entries'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    pub_date = models.DateTimeField()
+
+    class Meta:
+        ordering = ['-pub_date']
+        unique_together = ('user', 'post')
+        indexes = [
+            models.Index(fields=['user', '-pub_date']),
+            models.Index(fields=['user', 'author']),
+        ]
+
+
+class FollowSuggestion(models.Model):
+    """Автор, на которого стоит подписаться (см. follow_graph.py)."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='follow_suggestions'
+    )
+    author = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    rank = models.PositiveSmallIntegerField()
+    score = models.FloatField()
+
+    class Meta:
+        ordering = ['rank']
+        unique_together = ('user', 'rank')
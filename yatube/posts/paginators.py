@@ -0,0 +1,277 @@
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet
+from django.core.paginator import Page, Paginator
+from django.db import connections
+from django.db.models import Max, Q, QuerySet
+from django.utils.functional import cached_property
+from django.utils.dateparse import parse_datetime
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_decode, urlsafe_base64_encode
+
+from . import caching
+
+COUNT_KEY = 'count:{}'
+
+
+def encode_cursor(obj, field='pub_date'):
+    """Упаковывает позицию объекта (field, id) в непрозрачный токен.
+
+    obj — модель или словарь из QuerySet.values() с ключами field и id.
+    """
+    if isinstance(obj, dict):
+        value, pk = obj[field], obj['id']
+    else:
+        value, pk = getattr(obj, field), obj.pk
+    raw = f'{value.isoformat()},{pk}'
+    return urlsafe_base64_encode(force_bytes(raw))
+
+
+def decode_cursor(token):
+    """Возвращает (дата, id) из токена или None, если токен битый."""
+    try:
+        raw = urlsafe_base64_decode(token).decode()
+        value, pk = raw.rsplit(',', 1)
+        value = parse_datetime(value)
+        pk = int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+    if value is None:
+        return None
+    return value, pk
+
+
+def estimate_count(model, using='default'):
+    """Примерное число строк таблицы без COUNT(*) по всей таблице.
+
+    PostgreSQL хранит оценку в pg_class; на остальных базах берётся
+    MAX(pk) по индексу — верхняя граница, если строки удалялись.
+    """
+    connection = connections[using]
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples FROM pg_class WHERE relname = %s',
+                [model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        return int(row[0]) if row and row[0] >= 0 else None
+    return model._default_manager.using(using).aggregate(
+        max_pk=Max('pk')
+    )['max_pk'] or 0
+
+
+class EstimatedCountPaginator(Paginator):
+    """Paginator для админки, который не считает большие таблицы.
+
+    Без фильтров число строк оценивается (estimate_count), с фильтрами
+    и на небольших таблицах считается точно.
+    """
+
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if (not isinstance(queryset, QuerySet)
+                or queryset.query.has_filters()):
+            return super().count
+        estimate = estimate_count(queryset.model, queryset.db)
+        if estimate is None or estimate < self.exact_count_limit:
+            return super().count
+        return estimate
+
+
+class NumberedPage(Page):
+    @property
+    def elided_page_range(self):
+        return self.paginator.get_elided_page_range(self.number)
+
+
+class CachedCountPaginator(Paginator):
+    """Paginator с номерами страниц без COUNT(*) на каждый запрос.
+
+    Число объектов берётся из count (денормализованного счётчика) или
+    из кеша с версиями областей scopes (caching.py): запись в область
+    сбрасывает и закешированное число. Без того и другого — COUNT(*).
+    """
+
+    ELLIPSIS = '…'
+    on_each_side = 2
+    on_ends = 1
+
+    def __init__(self, object_list, per_page, count=None, scopes=(),
+                 **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self._count = count
+        self.scopes = scopes
+
+    @cached_property
+    def count(self):
+        if self._count is not None:
+            return self._count
+        if not self.scopes:
+            return super().count
+        try:
+            key = self._count_key()
+        except EmptyResultSet:
+            # QuerySet.none(): у него нет SQL для ключа и нет строк.
+            return 0
+        count = cache.get(key)
+        if count is None:
+            count = super().count
+            cache.set(key, count, settings.PAGE_CACHE_TIMEOUT)
+        return count
+
+    def _count_key(self):
+        versions = caching.get_versions(*self.scopes)
+        raw = f'{self.object_list.query}|{versions}'
+        return COUNT_KEY.format(hashlib.md5(raw.encode()).hexdigest())
+
+    def get_elided_page_range(self, number=1):
+        """Номера страниц: края, окно вокруг number и ELLIPSIS между ними.
+
+        Длина не зависит от числа страниц, в отличие от page_range.
+        """
+        number = self.validate_number(number)
+        window = self.on_each_side * 2 + self.on_ends * 2 + 3
+        if self.num_pages <= window:
+            yield from self.page_range
+            return
+        if number > 1 + self.on_each_side + self.on_ends + 1:
+            yield from range(1, self.on_ends + 1)
+            yield self.ELLIPSIS
+            start = number - self.on_each_side
+        else:
+            start = 1
+        if number < self.num_pages - self.on_each_side - self.on_ends - 1:
+            yield from range(start, number + self.on_each_side + 1)
+            yield self.ELLIPSIS
+            yield from range(self.num_pages - self.on_ends + 1,
+                             self.num_pages + 1)
+        else:
+            yield from range(start, self.num_pages + 1)
+
+    def _get_page(self, *args, **kwargs):
+        return NumberedPage(*args, **kwargs)
+
+
+class CursorPage(Page):
+    """Страница ленты без номера: знает только соседей по курсору."""
+
+    is_cursor = True
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+    @property
+    def next_cursor(self):
+        if not self._has_next or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[-1], self.paginator.field)
+
+    @property
+    def previous_cursor(self):
+        if not self._has_previous or not self.object_list:
+            return None
+        return encode_cursor(self.object_list[0], self.paginator.field)
+
+
+class CursorPaginator(Paginator):
+    """Keyset-пагинация по (field, id), по умолчанию (pub_date, id).
+
+    Не выполняет COUNT(*) и OFFSET: каждая страница — это диапазонный
+    запрос по индексу field, поэтому страница 5000 стоит столько же,
+    сколько первая. descending задаёт порядок: новые или старые первыми.
+    """
+
+    def __init__(self, object_list, per_page, field='pub_date',
+                 descending=True, **kwargs):
+        self.field = field
+        self.descending = descending
+        # Упорядоченный список: Paginator не предупреждает о порядке.
+        super().__init__(object_list.order_by(*self._ordering()), per_page,
+                         **kwargs)
+
+    def get_cursor_page(self, after=None, before=None):
+        if after is not None:
+            return self._page_after(after)
+        if before is not None:
+            return self._page_before(before)
+        objects = self._fetch(self.object_list.order_by(*self._ordering()))
+        return CursorPage(objects[:self.per_page], self,
+                          has_next=len(objects) > self.per_page,
+                          has_previous=False)
+
+    def _ordering(self, backwards=False):
+        prefix = '-' if self.descending != backwards else ''
+        return f'{prefix}{self.field}', f'{prefix}pk'
+
+    def _beyond(self, cursor, backwards=False):
+        value, pk = cursor
+        lookup = 'lt' if self.descending != backwards else 'gt'
+        return (Q(**{f'{self.field}__{lookup}': value})
+                | Q(**{self.field: value, f'pk__{lookup}': pk}))
+
+    def _page_after(self, cursor):
+        queryset = self.object_list.filter(
+            self._beyond(cursor)
+        ).order_by(*self._ordering())
+        objects = self._fetch(queryset)
+        return CursorPage(objects[:self.per_page], self,
+                          has_next=len(objects) > self.per_page,
+                          has_previous=True)
+
+    def _page_before(self, cursor):
+        queryset = self.object_list.filter(
+            self._beyond(cursor, backwards=True)
+        ).order_by(*self._ordering(backwards=True))
+        objects = self._fetch(queryset)
+        has_previous = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        objects.reverse()
+        return CursorPage(objects, self,
+                          has_next=True,
+                          has_previous=has_previous)
+
+    def _fetch(self, queryset):
+        return list(queryset[:self.per_page + 1])
+
+
+def get_page_obj(request, posts, count=None, scopes=(), field='pub_date'):
+    """Страница ленты для запроса.
+
+    По умолчанию лента листается курсором (?after=/?before=) по field.
+    Старые ссылки вида ?page=N продолжают работать через
+    CachedCountPaginator с числом постов count или закешированным по
+    областям scopes.
+    """
+    if 'page' in request.GET:
+        paginator = CachedCountPaginator(posts, settings.POSTS_PER_PAGE,
+                                         count=count, scopes=scopes)
+        return paginator.get_page(request.GET.get('page'))
+    paginator = CursorPaginator(posts, settings.POSTS_PER_PAGE, field=field)
+    after = decode_cursor(request.GET.get('after', ''))
+    before = decode_cursor(request.GET.get('before', ''))
+    return paginator.get_cursor_page(after=after, before=before)
+
+
+def get_comments_page(request, comments):
+    """Страница комментариев, от старых к новым, по курсору ?after=."""
+    paginator = CursorPaginator(comments, settings.COMMENTS_PER_PAGE,
+                                field='created', descending=False)
+    after = decode_cursor(request.GET.get('after', ''))
+    return paginator.get_cursor_page(after=after)
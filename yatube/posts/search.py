@@ -0,0 +1,58 @@
+import re
+
+from django.utils.html import escape
+from django.utils.safestring import mark_safe
+
+FTS_TABLE = 'posts_post_fts'
+# Управляющие символы вместо тегов: текст поста экранируется целиком,
+# и только потом маркеры превращаются в <mark>.
+MARK_START = '\x02'
+MARK_END = '\x03'
+SNIPPET_TOKENS = 16
+TERM = re.compile(r'(\w+)(\*?)')
+
+
+def match_expression(query):
+    """Переводит ввод пользователя в безопасное выражение MATCH.
+
+    Каждое слово берётся в кавычки, поэтому синтаксис FTS5 в запросе
+    не работает; 'прив*' ищет слова, начинающиеся на 'прив'.
+    Возвращает None, если в запросе нет ни одного слова.
+    """
+    terms = [
+        f'"{word}"{star}' for word, star in TERM.findall(query or '')
+    ]
+    return ' '.join(terms) or None
+
+
+def search_posts(queryset, query):
+    """Посты из queryset, подходящие под запрос, от самых релевантных.
+
+    У каждого поста есть атрибуты rank (bm25, меньше — лучше)
+    и snippet — фрагмент текста с отмеченными совпадениями.
+    """
+    expression = match_expression(query)
+    if expression is None:
+        return queryset.none()
+    snippet = (
+        f"snippet({FTS_TABLE}, 0, '{MARK_START}', '{MARK_END}', '…', "
+        f'{SNIPPET_TOKENS})'
+    )
+    return queryset.extra(
+        select={'rank': f'{FTS_TABLE}.rank', 'snippet': snippet},
+        tables=[FTS_TABLE],
+        where=[
+            f'{FTS_TABLE}.rowid = posts_post.id',
+            f'{FTS_TABLE} MATCH %s',
+        ],
+        params=[expression],
+    ).order_by('rank', '-pub_date')
+
+
+def highlight(snippet):
+    """HTML фрагмента: текст экранирован, совпадения в <mark>."""
+    return mark_safe(
+        escape(snippet)
+        .replace(MARK_START, '<mark>')
+        .replace(MARK_END, '</mark>')
+    )
@@ -0,0 +1,165 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import blobs, caching, counters, timeline
+from .models import Comment, Follow, Group, Post, User
+
+
+def bump_post_pages(post, *group_ids):
+    group_ids = {pk for pk in group_ids if pk is not None}
+    slugs = Group.objects.filter(pk__in=group_ids).values_list(
+        'slug', flat=True
+    ) if group_ids else []
+    caching.bump_on_commit(
+        'index',
+        f'profile:{post.author.username}',
+        *(f'group:{slug}' for slug in slugs)
+    )
+
+
+def bump_follow_pages(follow):
+    caching.bump_on_commit(*(
+        f'profile:{user.username}'
+        for user in (follow.user, follow.author) if user is not None
+    ))
+
+
+@receiver(pre_save, sender=Post)
+def remember_old_values(sender, instance, **kwargs):
+    instance._old_group_id = None
+    instance._old_image = None
+    if instance.pk is not None:
+        instance._old_group_id, instance._old_image = (
+            Post.objects.filter(pk=instance.pk)
+            .values_list('group_id', 'image')
+            .first()
+        ) or (None, None)
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        counters.bump_user(instance.author_id, posts_count=1)
+        counters.bump_group(instance.group_id, 1)
+        blobs.retain(instance.image.name)
+        timeline.fan_out(instance)
+        bump_post_pages(instance, instance.group_id)
+        return
+    old_image = getattr(instance, '_old_image', instance.image.name)
+    if old_image != instance.image.name:
+        blobs.retain(instance.image.name)
+        blobs.release(old_image)
+    old_group_id = getattr(instance, '_old_group_id', instance.group_id)
+    if old_group_id != instance.group_id:
+        counters.bump_group(old_group_id, -1)
+        counters.bump_group(instance.group_id, 1)
+    bump_post_pages(instance, old_group_id, instance.group_id)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, posts_count=-1)
+    counters.bump_group(instance.group_id, -1)
+    blobs.release(instance.image.name)
+    bump_post_pages(instance, instance.group_id)
+
+
+@receiver(pre_save, sender=Group)
+def remember_old_group(sender, instance, **kwargs):
+    instance._old_slug = instance._old_title = None
+    if instance.pk is not None:
+        instance._old_slug, instance._old_title = (
+            Group.objects.filter(pk=instance.pk)
+            .values_list('slug', 'title')
+            .first()
+        ) or (None, None)
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    caching.bump_on_commit('groups')
+    if created:
+        return
+    old_slug = getattr(instance, '_old_slug', None) or instance.slug
+    scopes = {f'group:{old_slug}', f'group:{instance.slug}'}
+    if (old_slug, getattr(instance, '_old_title', instance.title)) != (
+            instance.slug, instance.title):
+        # Название и ссылка группы есть в карточках постов на всех лентах.
+        scopes.add('index')
+        scopes.update(
+            f'profile:{username}' for username in
+            instance.posts.values_list('author__username', flat=True)
+            .distinct()
+        )
+    caching.bump_on_commit(*scopes)
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, instance, **kwargs):
+    caching.bump_on_commit('groups')
+
+
+@receiver(pre_save, sender=User)
+def remember_old_username(sender, instance, update_fields=None, **kwargs):
+    instance._old_username = None
+    # Вход обновляет только last_login: лишний запрос не нужен.
+    if instance.pk is None or (update_fields is not None
+                               and 'username' not in update_fields):
+        return
+    instance._old_username = (
+        User.objects.filter(pk=instance.pk)
+        .values_list('username', flat=True)
+        .first()
+    )
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    old_username = getattr(instance, '_old_username', None)
+    if created or raw or old_username in (None, instance.username):
+        return
+    # Имя автора есть в карточках его постов на общих лентах.
+    group_slugs = instance.posts.exclude(group=None).values_list(
+        'group__slug', flat=True
+    ).distinct()
+    caching.bump_on_commit(
+        'index',
+        f'profile:{old_username}',
+        f'profile:{instance.username}',
+        *(f'group:{slug}' for slug in group_slugs)
+    )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_post(instance.post_id, 1)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    counters.bump_post(instance.post_id, -1)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        counters.bump_user(instance.author_id, followers_count=1)
+        counters.bump_user(instance.user_id, following_count=1)
+        if instance.user_id is not None and instance.author_id is not None:
+            timeline.backfill(instance.user, instance.author)
+        bump_follow_pages(instance)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.bump_user(instance.author_id, followers_count=-1)
+    counters.bump_user(instance.user_id, following_count=-1)
+    timeline.cleanup(instance.user_id, instance.author_id)
+    if instance.author_id is not None:
+        timeline.follower_removed(instance.author_id)
+    bump_follow_pages(instance)
@@ -0,0 +1,76 @@
+import fcntl
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.core.files.move import file_move_safe
+from django.core.files.storage import FileSystemStorage
+from django.utils.deconstruct import deconstructible
+
+
+@deconstructible
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранит каждый уникальный файл один раз под именем его хеша.
+
+    Загрузка 'posts/small.gif' сохраняется как 'posts/ab/cd/<sha256>.gif':
+    хеш считается, пока файл пишется на диск, и повторная загрузка той же
+    картинки просто возвращает уже существующее имя.
+
+    Повторная загрузка и удаление файла (blobs.release) идут под общей
+    блокировкой lock(): иначе удаление могло бы убрать файл, который
+    только что снова начал использоваться.
+    """
+
+    lock_name = '.lock'
+
+    @contextmanager
+    def lock(self):
+        """Блокировка файлов хранилища, общая для потоков и процессов."""
+        os.makedirs(self.location, exist_ok=True)
+        with open(self.path(self.lock_name), 'a') as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def get_available_name(self, name, max_length=None):
+        # Итоговое имя выбирает _save() по содержимому файла.
+        return name
+
+    def _save(self, name, content):
+        directory, filename = os.path.split(name)
+        extension = os.path.splitext(filename)[1].lower()
+        os.makedirs(self.location, exist_ok=True)
+        digest = hashlib.sha256()
+        handle, temp_path = tempfile.mkstemp(dir=self.location,
+                                             suffix='.upload')
+        try:
+            with os.fdopen(handle, 'wb') as temp_file:
+                if hasattr(content, 'seek'):
+                    content.seek(0)
+                for chunk in content.chunks():
+                    digest.update(chunk)
+                    temp_file.write(chunk)
+            blob = digest.hexdigest()
+            name = os.path.join(directory, blob[:2], blob[2:4],
+                                blob + extension)
+            full_path = self.path(name)
+            with self.lock():
+                if os.path.exists(full_path):
+                    # Отметка для удаления: файл снова нужен. Время
+                    # точное, а не грубые часы файловой системы.
+                    now = time.time()
+                    os.utime(full_path, (now, now))
+                else:
+                    os.makedirs(os.path.dirname(full_path), exist_ok=True)
+                    file_move_safe(temp_path, full_path,
+                                   allow_overwrite=True)
+                    if self.file_permissions_mode is not None:
+                        os.chmod(full_path, self.file_permissions_mode)
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return name.replace('\\', '/')
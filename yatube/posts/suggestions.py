@@ -0,0 +1,20 @@
+from django.conf import settings
+
+from .models import FollowSuggestion
+
+
+def suggestions_for(user, limit=None):
+    """Рекомендации для страницы: один запрос по индексу (user, rank).
+
+    Авторы, на которых пользователь подписался после расчёта, пропускаются.
+    """
+    if not user.is_authenticated:
+        return []
+    return list(
+        FollowSuggestion.objects.filter(user=user)
+        .exclude(author__following__user=user)
+        .select_related('author')
+        .only('score', 'author', 'author__username', 'author__first_name',
+              'author__last_name')
+        [:limit or settings.FOLLOW_SUGGESTIONS_SHOWN]
+    )
@@ -0,0 +1,19 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from posts import holes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **params):
+    """Фрагмент name, зависящий от пользователя (posts/holes.py).
+
+    Для страницы, которая уйдёт в общий кеш, выводит метку: фрагмент
+    подставится при каждом ответе. Иначе рендерит его сразу.
+    """
+    request = context.get('request')
+    if getattr(request, 'punch_holes', False):
+        return mark_safe(holes.marker(request, name, params))
+    return mark_safe(holes.render(request, name, params))
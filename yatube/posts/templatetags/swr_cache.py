@@ -0,0 +1,58 @@
+import hashlib
+
+from django import template
+
+from posts import caching
+
+register = template.Library()
+
+FRAGMENT_KEY = 'fragment:{}:{}'
+
+
+class SwrCacheNode(template.Node):
+    def __init__(self, nodelist, timeout, name, vary_on, version):
+        self.nodelist = nodelist
+        self.timeout = timeout
+        self.name = name
+        self.vary_on = vary_on
+        self.version = version
+
+    def render(self, context):
+        vary_on = ':'.join(str(var.resolve(context)) for var in self.vary_on)
+        key = FRAGMENT_KEY.format(
+            self.name, hashlib.md5(vary_on.encode()).hexdigest()
+        )
+        value, _ = caching.get_or_refresh(
+            key,
+            lambda: self.nodelist.render(context),
+            f'fragment:{self.name}',
+            int(self.timeout.resolve(context)),
+            tag=self.version and str(self.version.resolve(context)),
+        )
+        return value
+
+
+@register.tag
+def swrcache(parser, token):
+    """{% swrcache timeout name [vary_on ...] [version=...] %}.
+
+    Как {% cache %}, но со сменой version фрагмент не пропадает из
+    кеша: его пересчитывает один запрос, остальные получают прежний
+    (caching.get_or_refresh).
+    """
+    bits = token.split_contents()
+    if len(bits) < 3:
+        raise template.TemplateSyntaxError(
+            f"'{bits[0]}' принимает минимум два аргумента"
+        )
+    nodelist = parser.parse(('endswrcache',))
+    parser.delete_first_token()
+    version = None
+    vary_on = []
+    for bit in bits[3:]:
+        if bit.startswith('version='):
+            version = parser.compile_filter(bit[len('version='):])
+        else:
+            vary_on.append(parser.compile_filter(bit))
+    return SwrCacheNode(nodelist, parser.compile_filter(bits[1]), bits[2],
+                        vary_on, version)
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверки числа SQL-запросов для TestCase."""
+
+    def count_queries(self, client, url, method='get', data=None):
+        """Выполняет запрос и возвращает (response, число запросов)."""
+        with CaptureQueriesContext(connection) as context:
+            response = getattr(client, method)(url, data)
+        return response, len(context.captured_queries)
+
+    @contextmanager
+    def assertMaxQueries(self, budget, msg=None):
+        """Падает, если внутри блока выполнено больше budget запросов."""
+        with CaptureQueriesContext(connection) as context:
+            yield context
+        executed = len(context.captured_queries)
+        if executed > budget:
+            queries = '\n'.join(
+                query['sql'] for query in context.captured_queries
+            )
+            self.fail(
+                msg or f'{executed} запросов при бюджете {budget}:\n{queries}'
+            )
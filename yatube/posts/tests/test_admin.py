@@ -0,0 +1,101 @@
+import datetime as dt
+from unittest import mock
+
+from django.contrib.admin import site
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from posts.models import Comment, Follow, Group, Post
+from posts.paginators import EstimatedCountPaginator
+from posts.tests.query_budget import QueryBudgetMixin
+
+User = get_user_model()
+
+POST_CHANGELIST = reverse('admin:posts_post_changelist')
+# Сессия, пользователь, оценка и число постов, группы, посты,
+# MIN/MAX дат и по запросу на каждый день в date_hierarchy (+1).
+POST_CHANGELIST_BUDGET = 9
+
+
+class AdminTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            'admin', 'admin@yatube.ru', 'pass'
+        )
+        Group.objects.bulk_create(
+            Group(title=f'Группа {i}', slug=f'group-{i}', description='')
+            for i in range(5)
+        )
+        cls.groups = list(Group.objects.order_by('pk'))
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.admin,
+                 group=cls.groups[i % len(cls.groups)])
+            for i in range(30)
+        )
+        Comment.objects.create(text='Коммент', post=Post.objects.first(),
+                               author=cls.admin)
+        Follow.objects.create(user=cls.admin, author=User.objects.create(
+            username='author'))
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.admin)
+
+    def test_changelists_open(self):
+        for model in ('post', 'group', 'comment', 'follow'):
+            with self.subTest(model=model):
+                response = self.client.get(
+                    reverse(f'admin:posts_{model}_changelist')
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_post_changelist_queries_do_not_grow_with_rows(self):
+        _, before = self.count_queries(self.client, POST_CHANGELIST)
+        Post.objects.bulk_create(
+            Post(text=f'Ещё пост {i}', author=self.admin,
+                 group=self.groups[0])
+            for i in range(100)
+        )
+        cache.clear()
+        _, after = self.count_queries(self.client, POST_CHANGELIST)
+        self.assertEqual(before, after)
+        self.assertLessEqual(after, POST_CHANGELIST_BUDGET)
+
+    def test_date_hierarchy_matches_queryset_dates(self):
+        Post.objects.filter(pk__in=[p.pk for p in Post.objects.all()[:10]])\
+            .update(pub_date=timezone.now() - dt.timedelta(days=400))
+        admin = site._registry[Post]
+        request = RequestFactory().get(POST_CHANGELIST)
+        request.user = self.admin
+        queryset = admin.get_queryset(request)
+        for kind in ('year', 'month', 'day'):
+            with self.subTest(kind=kind):
+                self.assertEqual(
+                    list(queryset.dates('pub_date', kind)),
+                    list(Post.objects.dates('pub_date', kind)),
+                )
+
+    def test_group_choices_cached_until_groups_change(self):
+        self.client.get(POST_CHANGELIST)
+        with self.assertMaxQueries(POST_CHANGELIST_BUDGET - 1):
+            self.client.get(POST_CHANGELIST)
+        Group.objects.create(title='Новая группа', slug='new', description='')
+        response = self.client.get(POST_CHANGELIST)
+        self.assertContains(response, 'Новая группа')
+
+    def test_unfiltered_count_is_estimated(self):
+        Post.objects.create(text='Удалённый пост', author=self.admin).delete()
+        last = Post.objects.create(text='Последний пост', author=self.admin)
+        with mock.patch.object(EstimatedCountPaginator,
+                               'exact_count_limit', 1):
+            response = self.client.get(POST_CHANGELIST)
+            self.assertEqual(response.context['cl'].result_count, last.pk)
+            response = self.client.get(POST_CHANGELIST,
+                                       {'pub_date__year': last.pub_date.year})
+            self.assertEqual(response.context['cl'].result_count,
+                             Post.objects.count())
@@ -0,0 +1,89 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+API_INDEX = reverse('posts:api_index')
+POSTS_COUNT = settings.POSTS_PER_PAGE + 5
+
+
+class FeedApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(POSTS_COUNT)
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        timeline.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def walk(self, client, url):
+        seen = []
+        data = client.get(url).json()
+        seen.extend(item['id'] for item in data['results'])
+        while data['next']:
+            data = client.get(url, {'after': data['next']}).json()
+            seen.extend(item['id'] for item in data['results'])
+        return seen
+
+    def test_feeds_match_html_order(self):
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        urls = (
+            (self.guest_client, API_INDEX),
+            (self.guest_client,
+             reverse('posts:api_group_list', args=(self.group.slug,))),
+            (self.guest_client,
+             reverse('posts:api_profile', args=(self.author.username,))),
+            (self.reader_client, reverse('posts:api_follow_index')),
+        )
+        for client, url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.walk(client, url), expected)
+
+    def test_field_selection(self):
+        data = self.guest_client.get(
+            API_INDEX, {'fields': 'text,author'}
+        ).json()
+        self.assertEqual(data['results'][0],
+                         {'text': Post.objects.first().text,
+                          'author': 'auth'})
+        for fields in ('password', 'comments_count'):
+            response = self.guest_client.get(API_INDEX, {'fields': fields})
+            self.assertEqual(response.status_code, 400)
+
+    def test_polling_returns_only_new_posts(self):
+        previous = self.guest_client.get(API_INDEX).json()['previous']
+        new = Post.objects.create(text='Новый пост', author=self.author)
+        data = self.guest_client.get(API_INDEX, {'before': previous}).json()
+        self.assertEqual([item['id'] for item in data['results']], [new.pk])
+
+    def test_follow_requires_login(self):
+        response = self.guest_client.get(reverse('posts:api_follow_index'))
+        self.assertEqual(response.status_code, 401)
+
+    def test_missing_group_is_404(self):
+        response = self.guest_client.get(
+            reverse('posts:api_group_list', args=('missing',))
+        )
+        self.assertEqual(response.status_code, 404)
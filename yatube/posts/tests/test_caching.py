@@ -0,0 +1,174 @@
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import transaction
+from django.test import (Client, TestCase, TransactionTestCase,
+                         override_settings)
+from django.urls import reverse
+
+from core import replicas
+from posts import caching
+from posts.models import Group, Post
+
+User = get_user_model()
+
+INDEX = reverse('posts:index')
+KEY = 'test:key'
+NAME = 'test'
+
+
+@override_settings(CACHE_STATS_SAMPLE=1)
+class GetOrRefreshTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = 0
+
+    def compute(self):
+        self.calls += 1
+        return f'значение {self.calls}'
+
+    def get(self, tag=None):
+        value, _ = caching.get_or_refresh(KEY, self.compute, NAME, 60,
+                                          tag=tag)
+        return value
+
+    def hold_lock(self):
+        cache.set(caching.LOCK_KEY.format(KEY), 1)
+
+    def test_fresh_value_is_computed_once(self):
+        self.assertEqual(self.get(), 'значение 1')
+        self.assertEqual(self.get(), 'значение 1')
+        self.assertEqual(caching.stats()[NAME],
+                         {'hit': 1, 'miss': 1, 'stale': 0})
+
+    def test_stale_value_served_while_another_worker_refreshes(self):
+        self.get(tag=1)
+        self.hold_lock()
+        self.assertEqual(self.get(tag=2), 'значение 1')
+        self.assertEqual(caching.stats()[NAME]['stale'], 1)
+        cache.delete(caching.LOCK_KEY.format(KEY))
+        self.assertEqual(self.get(tag=2), 'значение 2')
+
+    def test_pinned_session_does_not_get_stale_value(self):
+        self.get(tag=1)
+        self.hold_lock()
+        replicas._state.use_primary = True
+        try:
+            self.assertEqual(self.get(tag=2), 'значение 2')
+        finally:
+            replicas._state.use_primary = False
+
+    def test_stale_fragment_keeps_outer_value_stale(self):
+        self.get(tag=1)
+        self.hold_lock()
+
+        def outer():
+            return 'страница: ' + self.get(tag=2)
+
+        value, event = caching.get_or_refresh('test:outer', outer, NAME, 60)
+        self.assertEqual(value, 'страница: значение 1')
+        self.assertEqual(event, caching.STALE)
+        cache.delete(caching.LOCK_KEY.format(KEY))
+        # Внешнее значение не закешировано свежим: следующий запрос
+        # пересчитывает его уже со свежим фрагментом.
+        value, event = caching.get_or_refresh('test:outer', outer, NAME, 60)
+        self.assertEqual(value, 'страница: значение 2')
+        self.assertEqual(event, caching.MISS)
+
+    @override_settings(CACHE_LOCK_WAIT=0.1)
+    def test_cold_miss_computes_after_waiting_for_lock(self):
+        self.hold_lock()
+        self.assertEqual(self.get(), 'значение 1')
+
+
+@override_settings(CACHE_STATS_SAMPLE=1)
+class PageCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.admin = User.objects.create_user(username='admin', is_staff=True)
+        cls.post = Post.objects.create(text='Старый текст', author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+
+    def test_invalidated_page_is_served_stale_during_refresh(self):
+        self.client.get(INDEX)
+        lock = caching.LOCK_KEY.format(caching.page_key(INDEX))
+        cache.set(lock, 1)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        self.assertContains(self.client.get(INDEX), 'Старый текст')
+        cache.delete(lock)
+        self.assertContains(self.client.get(INDEX), 'Новый текст')
+
+    def test_stale_page_is_not_validated_after_refresh(self):
+        self.client.get(INDEX)
+        lock = caching.LOCK_KEY.format(caching.page_key(INDEX))
+        cache.set(lock, 1)
+        self.post.text = 'Новый текст'
+        self.post.save()
+        stale = self.client.get(INDEX)
+        self.assertContains(stale, 'Старый текст')
+        self.assertEqual(stale['Cache-Control'], 'no-cache')
+        cache.delete(lock)
+        self.client.get(INDEX)
+        response = self.client.get(INDEX, HTTP_IF_NONE_MATCH=stale['ETag'])
+        self.assertContains(response, 'Новый текст')
+
+    def test_group_rename_drops_old_and_new_pages(self):
+        group = Group.objects.create(title='Группа', slug='old')
+        Post.objects.filter(pk=self.post.pk).update(group=group)
+        old_url = reverse('posts:group_list', args=['old'])
+        self.assertEqual(self.client.get(old_url).status_code, 200)
+        self.client.get(INDEX)
+        group.slug = 'new'
+        group.title = 'Новая группа'
+        group.save()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertContains(self.client.get(INDEX),
+                            reverse('posts:group_list', args=['new']))
+
+    def test_user_rename_drops_old_profile(self):
+        old_url = reverse('posts:profile', args=['author'])
+        self.assertEqual(self.client.get(old_url).status_code, 200)
+        self.client.get(INDEX)
+        self.author.username = 'renamed'
+        self.author.save()
+        self.assertEqual(self.client.get(old_url).status_code, 404)
+        self.assertContains(self.client.get(INDEX),
+                            reverse('posts:profile', args=['renamed']))
+
+    @override_settings(CACHE_STATS_SAMPLE=100)
+    def test_sampled_stats_are_weighted(self):
+        with mock.patch('posts.caching.random.random', return_value=0.0):
+            self.client.get(INDEX)
+        with mock.patch('posts.caching.random.random', return_value=0.5):
+            self.client.get(INDEX)
+        self.assertEqual(caching.stats()['page:posts.views.index'],
+                         {'hit': 0, 'miss': 100, 'stale': 0})
+
+    def test_stats_for_staff_only(self):
+        self.client.get(INDEX)
+        self.client.get(INDEX)
+        url = reverse('posts:api_cache_stats')
+        self.client.force_login(self.author)
+        self.assertEqual(self.client.get(url).status_code, 403)
+        self.client.force_login(self.admin)
+        data = self.client.get(url).json()
+        self.assertEqual(data['page:posts.views.index'],
+                         {'hit': 1, 'miss': 1, 'stale': 0})
+
+
+class BumpOnCommitTests(TransactionTestCase):
+    def setUp(self):
+        cache.clear()
+
+    def test_scope_is_bumped_again_after_commit(self):
+        with transaction.atomic():
+            caching.bump_on_commit('index')
+            # Страница, закешированная до коммита, — с этой версией.
+            inside = caching.get_versions('index')
+        self.assertNotEqual(caching.get_versions('index'), inside)
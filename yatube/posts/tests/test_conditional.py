@@ -0,0 +1,130 @@
+from http import HTTPStatus
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post
+from posts.tests.query_budget import QueryBudgetMixin
+
+User = get_user_model()
+
+# Сессия, пользователь и состояние страницы; у закешированных страниц
+# вместо состояния — дырки (у профиля: кнопка подписки и рекомендации).
+NOT_MODIFIED_QUERIES = 3
+NOT_MODIFIED_QUERIES_PROFILE = 4
+
+
+class ConditionalGetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=(self.group.slug,)),
+            'profile': reverse('posts:profile', args=(self.author.username,)),
+            'detail': reverse('posts:post_detail', args=(self.post.pk,)),
+            'follow': reverse('posts:follow_index'),
+        }
+
+    def revalidate(self, url, response, client=None):
+        headers = {'HTTP_IF_NONE_MATCH': response['ETag']}
+        if response.has_header('Last-Modified'):
+            headers['HTTP_IF_MODIFIED_SINCE'] = response['Last-Modified']
+        return (client or self.client).get(url, **headers)
+
+    def test_unchanged_pages_not_modified_without_rendering(self):
+        for name, url in self.urls.items():
+            with self.subTest(page=name):
+                first = self.client.get(url)
+                self.assertEqual(first.status_code, HTTPStatus.OK)
+                budget = (NOT_MODIFIED_QUERIES_PROFILE if name == 'profile'
+                          else NOT_MODIFIED_QUERIES)
+                with self.assertMaxQueries(budget):
+                    again = self.revalidate(url, first)
+                self.assertEqual(again.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+
+    def test_cached_pages_revalidate_without_state_queries(self):
+        guest = Client()
+        for name in ('index', 'group', 'profile'):
+            url = self.urls[name]
+            with self.subTest(page=name, user='guest'):
+                first = guest.get(url)
+                with self.assertNumQueries(0):
+                    again = self.revalidate(url, first, guest)
+                self.assertEqual(again.status_code,
+                                 HTTPStatus.NOT_MODIFIED)
+        # Авторизованному нужны только сессия и пользователь для шапки.
+        first = self.client.get(self.urls['index'])
+        with self.assertNumQueries(2):
+            again = self.revalidate(self.urls['index'], first)
+        self.assertEqual(again.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def assert_changed_by(self, names, change):
+        before = {name: self.client.get(self.urls[name]) for name in names}
+        change()
+        for name in names:
+            with self.subTest(page=name):
+                response = self.revalidate(self.urls[name], before[name])
+                self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_new_post_changes_feeds(self):
+        def publish():
+            Post.objects.create(
+                text='Новый', author=self.author, group=self.group
+            )
+        self.assert_changed_by(
+            ('index', 'group', 'profile', 'follow'), publish
+        )
+
+    def test_edit_changes_pages(self):
+        def edit():
+            self.post.text = 'Исправленный пост'
+            self.post.save()
+        self.assert_changed_by(
+            ('index', 'group', 'profile', 'detail', 'follow'), edit
+        )
+
+    def test_comments_change_detail(self):
+        comment = Comment.objects.create(text='Коммент', post=self.post,
+                                         author=self.reader)
+        self.assert_changed_by(('detail',), comment.delete)
+        self.assert_changed_by(
+            ('detail',),
+            lambda: Comment.objects.create(text='Ещё', post=self.post,
+                                           author=self.reader),
+        )
+
+    def test_follow_changes_profile(self):
+        self.assert_changed_by(
+            ('profile',),
+            lambda: Follow.objects.filter(user=self.reader).delete(),
+        )
+
+    def test_etag_depends_on_user(self):
+        first = self.client.get(self.urls['index'])
+        self.client.force_login(self.author)
+        response = self.revalidate(self.urls['index'], first)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+
+    def test_missing_page_has_no_validators(self):
+        response = self.client.get(
+            reverse('posts:group_list', args=('missing',))
+        )
+        self.assertEqual(response.status_code, HTTPStatus.NOT_FOUND)
+        self.assertFalse(response.has_header('ETag'))
@@ -0,0 +1,72 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, UserStats
+
+User = get_user_model()
+
+
+class CountersTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(
+            title='Test title',
+            slug='test-slug',
+            description='Test description'
+        )
+        cls.other_group = Group.objects.create(
+            title='Other title',
+            slug='other-slug',
+            description='Other description'
+        )
+
+    def stats(self, user):
+        return UserStats.objects.get(user=user)
+
+    def test_counters_follow_writes(self):
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   group=self.group)
+        Comment.objects.create(text='Коммент', post=post, author=self.reader)
+        follow = Follow.objects.create(user=self.reader, author=self.user)
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.stats(self.user).posts_count, 1)
+        self.assertEqual(self.stats(self.user).followers_count, 1)
+        self.assertEqual(self.stats(self.reader).following_count, 1)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
+
+        post.group = self.other_group
+        post.save()
+        self.group.refresh_from_db()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.group.posts_count, 0)
+        self.assertEqual(self.other_group.posts_count, 1)
+
+        follow.delete()
+        post.delete()
+        self.other_group.refresh_from_db()
+        self.assertEqual(self.stats(self.user).posts_count, 0)
+        self.assertEqual(self.stats(self.user).followers_count, 0)
+        self.assertEqual(self.other_group.posts_count, 0)
+
+    def test_recount_command(self):
+        post = Post.objects.create(text='Пост', author=self.user,
+                                   group=self.group)
+        Comment.objects.create(text='Коммент', post=post, author=self.reader)
+        UserStats.objects.all().delete()
+        Group.objects.update(posts_count=0)
+        Post.objects.update(comments_count=0)
+        call_command('recount_counters', stdout=StringIO())
+        post.refresh_from_db()
+        self.group.refresh_from_db()
+        self.assertEqual(self.stats(self.user).posts_count, 1)
+        self.assertEqual(self.stats(self.reader).posts_count, 0)
+        self.assertEqual(self.group.posts_count, 1)
+        self.assertEqual(post.comments_count, 1)
@@ -0,0 +1,76 @@
+import csv
+import io
+import json
+import os
+import tempfile
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Group, Post
+
+User = get_user_model()
+
+
+@override_settings(EXPORT_CHUNK_SIZE=2)
+class ExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.group = Group.objects.create(
+            title='Группа', slug='group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(text=f'Пост, "{i}"\nстрока', author=cls.author,
+                                group=cls.group if i % 2 else None)
+            for i in range(5)
+        ]
+        Post.objects.create(text='Чужой пост', author=cls.stranger)
+        Comment.objects.create(text='Коммент', post=cls.posts[0],
+                               author=cls.author)
+        cls.url = reverse('posts:profile_export', args=(cls.author.username,))
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.author)
+
+    def read(self, response):
+        self.assertTrue(response.streaming)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        rows = [
+            json.loads(line)
+            for line in self.read(self.client.get(self.url)).splitlines()
+        ]
+        self.assertEqual([row['type'] for row in rows],
+                         ['post'] * 5 + ['comment'])
+        self.assertEqual([row['id'] for row in rows[:5]],
+                         [post.pk for post in self.posts])
+        self.assertEqual(rows[1]['group'], self.group.slug)
+        self.assertEqual(rows[5]['post_id'], self.posts[0].pk)
+
+    def test_csv(self):
+        response = self.client.get(self.url, {'format': 'csv'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        rows = list(csv.DictReader(io.StringIO(self.read(response))))
+        self.assertEqual(len(rows), 6)
+        self.assertEqual(rows[0]['text'], self.posts[0].text)
+
+    def test_only_owner_or_staff(self):
+        self.client.force_login(self.stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+        self.stranger.is_staff = True
+        self.stranger.save()
+        self.assertEqual(self.client.get(self.url).status_code, 200)
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.ndjson')
+            call_command('export_yatube', 'auth', output=path,
+                         stderr=io.StringIO())
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(len(file.readlines()), 6)
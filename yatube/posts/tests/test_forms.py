@@ -4,7 +4,7 @@ import tempfile
 from django import forms
 from django.conf import settings
 from django.core.files.uploadedfile import SimpleUploadedFile
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
 from posts.forms import PostForm
@@ -15,6 +15,7 @@ TEXT = 'Текст для нового поста'
 IMAGE = 'new_image/jpg'
 
 
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
 class StaticURLTests(TestCase):
     @classmethod
     def setUpClass(cls):
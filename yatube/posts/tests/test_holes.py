@@ -0,0 +1,80 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, RequestFactory, TestCase
+from django.urls import reverse
+
+from posts import holes
+from posts.models import Follow, Group, Post
+
+User = get_user_model()
+
+INDEX = reverse('posts:index')
+
+
+class HoleTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(text='Пост', author=cls.author,
+                                       group=cls.group)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_body_is_shared_and_header_is_personal(self):
+        guest_page = self.guest_client.get(INDEX).content.decode()
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
+        reader_page = self.reader_client.get(INDEX).content.decode()
+        self.assertIn('Пост', reader_page)
+        self.assertNotIn('Мимо сигналов', reader_page)
+        self.assertIn('Пользователь: reader', reader_page)
+        self.assertIn(reverse('posts:follow_index'), reader_page)
+        self.assertNotIn('Пользователь:', guest_page)
+        self.assertNotIn(holes.MARKER_PREFIX, reader_page)
+        self.assertNotIn(holes.MARKER_PREFIX, guest_page)
+
+    def test_follow_button_depends_on_user(self):
+        url = reverse('posts:profile', args=[self.author.username])
+        self.assertContains(self.reader_client.get(url), 'Отписаться')
+        response = self.guest_client.get(url)
+        self.assertContains(response, 'Подписаться')
+        self.assertNotContains(response, 'Отписаться')
+
+    def test_comment_form_only_for_users(self):
+        url = reverse('posts:post_detail', args=[self.post.pk])
+        self.assertContains(self.reader_client.get(url),
+                            'csrfmiddlewaretoken')
+        self.assertNotContains(self.guest_client.get(url),
+                               'csrfmiddlewaretoken')
+
+    def test_fill_renders_each_hole_once(self):
+        request = RequestFactory().get(INDEX)
+        request.user = self.reader
+        marker = holes.marker(request, 'follow_button',
+                              {'username': 'author'})
+        with self.assertNumQueries(1):
+            content = holes.fill(request, marker + marker)
+        self.assertEqual(content.count('Отписаться'), 2)
+
+    def test_marker_in_post_text_is_not_filled(self):
+        forged = [
+            'hi <!--hole:header?x=1-->',
+            holes.marker(RequestFactory().get(INDEX), 'comment_form',
+                         {'post_id': self.post.pk}),
+        ]
+        for text in forged:
+            with self.subTest(text=text):
+                cache.clear()
+                Post.objects.filter(pk=self.post.pk).update(text=text)
+                response = self.reader_client.get(reverse('posts:api_index'))
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(response.json()['results'][0]['text'], text)
+                self.assertNotContains(response, 'csrfmiddlewaretoken')
@@ -0,0 +1,106 @@
+import json
+import os
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+from posts.management.commands.import_yatube import Command
+from posts.models import Comment, Follow, Group, Post, UserStats
+from posts.search import search_posts
+
+User = get_user_model()
+
+ROWS = [
+    {'type': 'user', 'username': 'anna', 'first_name': 'Анна'},
+    {'type': 'user', 'username': 'boris'},
+    {'type': 'group', 'slug': 'cats', 'title': 'Коты'},
+    {'type': 'post', 'id': 1, 'author': 'anna', 'group': 'cats',
+     'text': 'Первый импортированный пост',
+     'pub_date': '2020-01-01T10:00:00+00:00'},
+    {'type': 'post', 'id': 2, 'author': 'boris', 'text': 'Второй пост'},
+    {'type': 'post', 'id': 3, 'author': 'nobody', 'text': 'Без автора'},
+    {'type': 'comment', 'post': 1, 'author': 'boris', 'text': 'Коммент'},
+    {'type': 'comment', 'post': 99, 'author': 'boris', 'text': 'Сирота'},
+    {'type': 'follow', 'user': 'boris', 'author': 'anna'},
+    {'type': 'follow', 'user': 'boris', 'author': 'anna'},
+]
+
+
+class ImportCommandTests(TestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, 'dump.ndjson')
+        with open(self.path, 'w', encoding='utf-8') as file:
+            for row in ROWS:
+                file.write(json.dumps(row, ensure_ascii=False) + '\n')
+            file.write('не json\n')
+
+    def run_import(self, **options):
+        output = StringIO()
+        call_command('import_yatube', self.path, batch_size=3,
+                     stdout=output, **options)
+        return output.getvalue()
+
+    def assert_imported(self, users=2):
+        self.assertEqual(User.objects.count(), users)
+        self.assertEqual(Group.objects.get().posts_count, 1)
+        self.assertEqual(Post.objects.filter(author__username__in=(
+            'anna', 'boris')).count(), 2)
+        self.assertEqual(Comment.objects.count(), 1)
+        self.assertEqual(Follow.objects.count(), 1)
+        anna = User.objects.get(username='anna')
+        self.assertEqual(anna.stats.followers_count, 1)
+        post = Post.objects.get(author=anna)
+        self.assertEqual(post.pub_date.year, 2020)
+        self.assertEqual(post.comments_count, 1)
+        self.assertEqual(list(search_posts(Post.objects.all(),
+                                           'импортированный')), [post])
+
+    def test_import(self):
+        output = self.run_import()
+        self.assert_imported()
+        self.assertIn('пропущено: 4', output)
+        self.assertIn('строк/с', output)
+        self.assertFalse(os.path.exists(f'{self.path}.ckpt'))
+
+    def test_resume_after_failure(self):
+        original = Command.import_batch
+        calls = []
+
+        def fail_on_third(command, batch):
+            calls.append(batch)
+            if len(calls) == 3:
+                raise RuntimeError('сбой')
+            return original(command, batch)
+
+        with mock.patch.object(Command, 'import_batch', fail_on_third):
+            with self.assertRaises(RuntimeError):
+                self.run_import()
+        self.assertTrue(os.path.exists(f'{self.path}.ckpt'))
+        output = self.run_import()
+        self.assertIn('Продолжение со строки 7', output)
+        self.assert_imported()
+
+    def test_taken_primary_key_stops_import(self):
+        other = User.objects.create_user(username='other')
+        Post.objects.create(pk=101, text='Пост с сайта', author=other)
+        with mock.patch(
+            'posts.management.commands.import_yatube.next_pk',
+            return_value=100
+        ):
+            with self.assertRaises(CommandError):
+                self.run_import()
+        self.assertEqual(Post.objects.get(pk=101).text, 'Пост с сайта')
+
+    def test_finish_recounts_only_imported_rows(self):
+        other = User.objects.create_user(username='other')
+        Post.objects.create(text='Пост с сайта', author=other)
+        UserStats.objects.filter(user=other).update(posts_count=5)
+        self.run_import()
+        self.assert_imported(users=3)
+        self.assertEqual(UserStats.objects.get(user=other).posts_count, 5)
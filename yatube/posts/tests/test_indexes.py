@@ -0,0 +1,103 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+
+def index_name(model, fields):
+    for index in model._meta.indexes:
+        if index.fields == fields:
+            return index.name
+    with connection.cursor() as cursor:
+        constraints = connection.introspection.get_constraints(
+            cursor, model._meta.db_table
+        )
+    columns = [model._meta.get_field(field).column for field in fields]
+    for name, constraint in constraints.items():
+        if constraint['unique'] and constraint['columns'] == columns:
+            return name
+    raise LookupError(fields)
+
+
+class IndexUsageTests(TestCase):
+    """Запросы представлений идут по составным индексам (EXPLAIN)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(text='Пост', author=cls.author,
+                                       group=cls.group)
+        Comment.objects.create(text='Комментарий', post=cls.post,
+                               author=cls.reader)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        timeline.rebuild()
+
+    def setUp(self):
+        cache.clear()
+        self.client = Client()
+        self.client.force_login(self.reader)
+
+    def plans(self, url):
+        """Планы всех SELECT, выполненных представлением по url."""
+        with CaptureQueriesContext(connection) as context:
+            self.client.get(url)
+        plans = []
+        with connection.cursor() as cursor:
+            for query in context.captured_queries:
+                if not query['sql'].startswith('SELECT'):
+                    continue
+                cursor.execute('EXPLAIN QUERY PLAN ' + query['sql'])
+                plans.append(' '.join(row[-1] for row in cursor.fetchall()))
+        return '\n'.join(plans)
+
+    def assertUsesIndex(self, url, *indexes):
+        plans = self.plans(url)
+        for model, fields in indexes:
+            name = index_name(model, fields)
+            self.assertIn(name, plans, f'{url}: нет {name}')
+
+    def test_profile_uses_author_pub_date(self):
+        self.assertUsesIndex(
+            reverse('posts:profile', args=[self.author.username]),
+            (Post, ['author', '-pub_date']),
+            (Follow, ['user', 'author']),
+        )
+
+    def test_group_list_uses_group_pub_date(self):
+        self.assertUsesIndex(
+            reverse('posts:group_list', args=[self.group.slug]),
+            (Post, ['group', '-pub_date'])
+        )
+
+    def test_post_detail_uses_post_created(self):
+        self.assertUsesIndex(
+            reverse('posts:post_detail', args=[self.post.pk]),
+            (Comment, ['post', 'created'])
+        )
+
+    def test_follow_index_uses_timeline_user_pub_date(self):
+        self.assertUsesIndex(
+            reverse('posts:follow_index'),
+            (TimelineEntry, ['user', '-pub_date'])
+        )
+
+    def test_follow_views_use_user_author(self):
+        for name in ('posts:profile_unfollow', 'posts:profile_follow'):
+            with self.subTest(name=name):
+                self.assertUsesIndex(
+                    reverse(name, args=[self.author.username]),
+                    (Follow, ['user', 'author'])
+                )
+
+    def test_follow_is_unique(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Follow.objects.create(user=self.reader, author=self.author)
@@ -0,0 +1,158 @@
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Post
+from posts.paginators import CachedCountPaginator, decode_cursor, encode_cursor
+
+User = get_user_model()
+
+INDEX = reverse('posts:index')
+POSTS_COUNT = settings.POSTS_PER_PAGE * 2 + 3
+COMMENTS_COUNT = settings.COMMENTS_PER_PAGE * 2 + 3
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.user)
+            for i in range(POSTS_COUNT)
+        )
+        cls.guest_client = Client()
+
+    def setUp(self):
+        cache.clear()
+
+    def test_cursor_round_trip(self):
+        post = Post.objects.first()
+        self.assertEqual(decode_cursor(encode_cursor(post)),
+                         (post.pub_date, post.pk))
+        self.assertIsNone(decode_cursor('garbage'))
+
+    def test_walks_all_posts_without_gaps(self):
+        seen = []
+        url = INDEX
+        while url:
+            page_obj = self.guest_client.get(url).context['page_obj']
+            seen.extend(post.pk for post in page_obj)
+            url = (f'{INDEX}?after={page_obj.next_cursor}'
+                   if page_obj.has_next() else None)
+        expected = list(
+            Post.objects.order_by('-pub_date', '-pk')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_previous_page_matches_first_page(self):
+        first = self.guest_client.get(INDEX).context['page_obj']
+        second = self.guest_client.get(
+            f'{INDEX}?after={first.next_cursor}').context['page_obj']
+        back = self.guest_client.get(
+            f'{INDEX}?before={second.previous_cursor}').context['page_obj']
+        self.assertEqual(list(back), list(first))
+        self.assertFalse(back.has_previous())
+
+    def test_numbered_pages_still_work(self):
+        response = self.guest_client.get(INDEX + '?page=3')
+        self.assertEqual(len(response.context['page_obj']), 3)
+
+
+class CommentsPaginationTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+        Comment.objects.bulk_create(
+            Comment(text=f'Коммент {i}', post=cls.post, author=cls.user)
+            for i in range(COMMENTS_COUNT)
+        )
+        cls.guest_client = Client()
+
+    def test_comments_walked_in_order_through_fragments(self):
+        response = self.guest_client.get(
+            reverse('posts:post_detail', args=(self.post.pk,))
+        )
+        comments = response.context['comments']
+        seen = [comment.pk for comment in comments]
+        self.assertEqual(len(seen), settings.COMMENTS_PER_PAGE)
+        fragment = reverse('posts:comments', args=(self.post.pk,))
+        while comments.has_next():
+            response = self.guest_client.get(
+                f'{fragment}?after={comments.next_cursor}'
+            )
+            self.assertTemplateNotUsed(response, 'base.html')
+            comments = response.context['comments']
+            seen.extend(comment.pk for comment in comments)
+        expected = list(
+            Comment.objects.order_by('created', 'pk')
+            .values_list('pk', flat=True)
+        )
+        self.assertEqual(seen, expected)
+
+    def test_last_fragment_has_no_more_link(self):
+        fragment = reverse('posts:comments', args=(self.post.pk,))
+        last = Comment.objects.order_by('created', 'pk')[COMMENTS_COUNT - 2]
+        response = self.guest_client.get(
+            f'{fragment}?after={encode_cursor(last, "created")}'
+        )
+        self.assertEqual(len(response.context['comments']), 1)
+        self.assertNotContains(response, 'comments-more')
+
+    def test_fragment_of_missing_post_is_404(self):
+        fragment = reverse('posts:comments', args=(self.post.pk + 1,))
+        self.assertEqual(self.guest_client.get(fragment).status_code, 404)
+
+
+class CachedCountPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='auth')
+        for i in range(20):
+            Post.objects.create(text=f'Пост {i}', author=cls.user)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_count_comes_from_counter(self):
+        paginator = CachedCountPaginator(Post.objects.all(), 1, count=42)
+        with self.assertNumQueries(0):
+            self.assertEqual(paginator.num_pages, 42)
+
+    def test_count_is_cached_until_scope_changes(self):
+        def count():
+            return CachedCountPaginator(Post.objects.all(), 1,
+                                        scopes=('index',)).count
+
+        self.assertEqual(count(), 20)
+        with self.assertNumQueries(0):
+            self.assertEqual(count(), 20)
+        Post.objects.create(text='Новый пост', author=self.user)
+        self.assertEqual(count(), 21)
+
+    def test_elided_page_range(self):
+        paginator = CachedCountPaginator(range(1000), 10)
+        ellipsis = paginator.ELLIPSIS
+        self.assertEqual(list(paginator.get_elided_page_range(1)),
+                         [1, 2, 3, ellipsis, 100])
+        self.assertEqual(list(paginator.get_elided_page_range(50)),
+                         [1, ellipsis, 48, 49, 50, 51, 52, ellipsis, 100])
+        self.assertEqual(list(paginator.get_elided_page_range(100)),
+                         [1, ellipsis, 98, 99, 100])
+        self.assertEqual(list(CachedCountPaginator(range(50), 10)
+                              .get_elided_page_range(3)), [1, 2, 3, 4, 5])
+
+    @override_settings(POSTS_PER_PAGE=1)
+    def test_page_links_do_not_grow_with_page_count(self):
+        response = Client().get(
+            reverse('posts:profile', args=[self.user.username]),
+            {'page': 10}
+        )
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 20)
+        # Первая, Предыдущая, 1, …, 8-12, …, 20, Следующая, Последняя.
+        self.assertContains(response, 'class="page-link"', count=13)
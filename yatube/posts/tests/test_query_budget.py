@@ -0,0 +1,144 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+from posts.tests.query_budget import QueryBudgetMixin
+from posts.urls import urlpatterns
+
+User = get_user_model()
+
+POSTS_COUNT = 100
+PAGE_SIZES = (1, 10, 100)
+
+# Измеренное число SQL-запросов на запрос авторизованного пользователя
+# (два из них — сессия и пользователь, у страниц с ETag ещё один —
+# состояние страницы, см. conditional.py). profile_follow — первая
+# подписка на автора: его счётчики UserStats считаются с нуля.
+MEASURED_QUERIES = {
+    'posts:index': 3,
+    'posts:group_list': 4,
+    'posts:profile': 6,
+    'posts:post_detail': 5,
+    'posts:post_create': 3,
+    'posts:post_edit': 5,
+    'posts:add_comment': 5,
+    'posts:follow_index': 6,
+    'posts:profile_follow': 18,
+    'posts:profile_unfollow': 8,
+    'posts:profile_export': 3,
+    'posts:comments': 2,
+    'posts:search': 4,
+    'posts:search_api': 2,
+    'posts:api_index': 1,
+    'posts:api_group_list': 2,
+    'posts:api_profile': 2,
+    'posts:api_follow_index': 4,
+    'posts:api_cache_stats': 2,
+}
+# Бюджет — измеренное число плюс небольшой запас. Страницы из
+# FEED_PAGES дополнительно проверяются на размерах страницы PAGE_SIZES:
+# число запросов не должно зависеть от числа постов на странице.
+QUERY_MARGIN = 1
+QUERY_BUDGETS = {
+    name: count + QUERY_MARGIN for name, count in MEASURED_QUERIES.items()
+}
+FEED_PAGES = (
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:follow_index',
+    'posts:search',
+    'posts:search_api',
+    'posts:api_index',
+    'posts:api_group_list',
+    'posts:api_profile',
+    'posts:api_follow_index',
+)
+AUTHOR_VIEWS = ('posts:post_edit', 'posts:profile_export')
+WRITE_VIEWS = {
+    'posts:add_comment': 'post',
+}
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='auth')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.stranger = User.objects.create_user(username='stranger')
+        cls.group = Group.objects.create(
+            title='Test title',
+            slug='test-slug',
+            description='Test description'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        posts = Post.objects.bulk_create(
+            Post(text=f'Пост {i}', author=cls.author, group=cls.group)
+            for i in range(POSTS_COUNT)
+        )
+        cls.post = Post.objects.first()
+        TimelineEntry.objects.bulk_create(
+            TimelineEntry(user=cls.reader, post=post, author=cls.author,
+                          pub_date=post.pub_date)
+            for post in Post.objects.all()
+        )
+        Comment.objects.bulk_create(
+            Comment(text=f'Коммент {i}', post=cls.post, author=cls.reader)
+            for i in range(len(posts))
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def url(self, name):
+        args = {
+            'posts:group_list': [self.group.slug],
+            'posts:profile': [self.author.username],
+            'posts:api_group_list': [self.group.slug],
+            'posts:api_profile': [self.author.username],
+            'posts:post_detail': [self.post.pk],
+            'posts:post_edit': [self.post.pk],
+            'posts:add_comment': [self.post.pk],
+            'posts:comments': [self.post.pk],
+            'posts:profile_follow': [self.stranger.username],
+            'posts:profile_unfollow': [self.author.username],
+            'posts:profile_export': [self.author.username],
+        }
+        return reverse(name, args=args.get(name))
+
+    def test_every_url_has_budget(self):
+        names = {f'posts:{pattern.name}' for pattern in urlpatterns}
+        self.assertEqual(names, set(QUERY_BUDGETS))
+
+    def test_views_fit_budget(self):
+        for name, budget in QUERY_BUDGETS.items():
+            client = (self.author_client if name in AUTHOR_VIEWS
+                      else self.reader_client)
+            method = WRITE_VIEWS.get(name, 'get')
+            with self.subTest(name=name):
+                cache.clear()
+                with self.assertMaxQueries(budget):
+                    getattr(client, method)(
+                        self.url(name), {'text': 'Текст', 'q': 'пост'}
+                    )
+
+    def test_feed_queries_do_not_grow_with_page_size(self):
+        for name in FEED_PAGES:
+            with self.subTest(name=name):
+                counts = []
+                for per_page in PAGE_SIZES:
+                    cache.clear()
+                    with override_settings(POSTS_PER_PAGE=per_page):
+                        _, executed = self.count_queries(
+                            self.reader_client, self.url(name),
+                            data={'q': 'пост'}
+                        )
+                    counts.append(executed)
+                self.assertEqual(len(set(counts)), 1, counts)
+                self.assertLessEqual(counts[0], QUERY_BUDGETS[name])
@@ -0,0 +1,98 @@
+import os
+import sqlite3
+import tempfile
+import time
+from unittest import mock
+
+from django.contrib.sessions.models import Session
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, override_settings
+
+from core.replicas import (PIN_COOKIE, ReplicaPinMiddleware, ReplicaRouter,
+                           replicate)
+from posts.models import Post
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'], REPLICA_PIN_SECONDS=5)
+class ReplicaRouterTests(SimpleTestCase):
+    def setUp(self):
+        self.router = ReplicaRouter()
+        self.factory = RequestFactory()
+
+    def route(self, request, view):
+        seen = {}
+
+        def wrapped(request):
+            seen['read'] = self.router.db_for_read(Post)
+            view()
+            return HttpResponse()
+
+        response = ReplicaPinMiddleware(wrapped)(request)
+        return seen['read'], response
+
+    def test_reads_go_to_replica(self):
+        db, response = self.route(self.factory.get('/'), lambda: None)
+        self.assertEqual(db, 'replica1')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_writes_pin_session_to_primary(self):
+        db, response = self.route(
+            self.factory.post('/'),
+            lambda: self.router.db_for_write(Post),
+        )
+        self.assertEqual(db, 'default')
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 5)
+
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = response.cookies[PIN_COOKIE].value
+        db, _ = self.route(request, lambda: None)
+        self.assertEqual(db, 'default')
+
+    def test_write_in_get_request_pins_too(self):
+        _, response = self.route(
+            self.factory.get('/'), lambda: self.router.db_for_write(Post)
+        )
+        self.assertIn(PIN_COOKIE, response.cookies)
+
+    def test_expired_pin_reads_replica(self):
+        request = self.factory.get('/')
+        request.COOKIES[PIN_COOKIE] = str(time.time() - 1)
+        db, _ = self.route(request, lambda: None)
+        self.assertEqual(db, 'replica1')
+
+    @override_settings(DATABASE_REPLICAS=['replica1', 'replica2'])
+    def test_request_reads_one_replica(self):
+        choices = iter(['replica1', 'replica2'])
+        with mock.patch('core.replicas.random.choice',
+                        side_effect=lambda replicas: next(choices)):
+            seen = []
+
+            def view(request):
+                seen.extend(self.router.db_for_read(Post) for _ in range(3))
+                return HttpResponse()
+
+            ReplicaPinMiddleware(view)(self.factory.get('/'))
+            ReplicaPinMiddleware(view)(self.factory.get('/'))
+        self.assertEqual(seen, ['replica1'] * 3 + ['replica2'] * 3)
+
+    def test_sessions_always_read_primary(self):
+        self.assertEqual(self.router.db_for_read(Session), 'default')
+
+    def test_replicas_are_not_migrated(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'posts'))
+        self.assertTrue(self.router.allow_migrate('default', 'posts'))
+
+    def test_replicate_copies_primary(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary = os.path.join(directory, 'primary.sqlite3')
+            replica = os.path.join(directory, 'replica.sqlite3')
+            with sqlite3.connect(primary) as connection:
+                connection.execute('CREATE TABLE t (x)')
+                connection.execute('INSERT INTO t VALUES (1)')
+            connection.close()
+            replicate(primary, replica)
+            connection = sqlite3.connect(replica)
+            self.assertEqual(
+                connection.execute('SELECT x FROM t').fetchall(), [(1,)]
+            )
+            connection.close()
@@ -0,0 +1,84 @@
+from django.contrib.auth import get_user_model
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Post
+from posts.search import match_expression, search_posts
+
+User = get_user_model()
+
+SEARCH = reverse('posts:search')
+SEARCH_API = reverse('posts:search_api')
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+        cls.once = Post.objects.create(
+            text='Привет из Казани, погода отличная', author=cls.user)
+        cls.twice = Post.objects.create(
+            text='Казань, Казань! Снова в Казани', author=cls.user)
+        cls.other = Post.objects.create(
+            text='Приветствую всех <b>читателей</b>', author=cls.user)
+        cls.guest_client = Client()
+
+    def found(self, query):
+        return list(search_posts(Post.objects.all(), query))
+
+    def test_match_expression_quotes_terms(self):
+        self.assertEqual(match_expression('пост OR "x" прив*'),
+                         '"пост" "OR" "x" "прив"*')
+        self.assertIsNone(match_expression(' - "" '))
+
+    def test_finds_words_case_insensitive(self):
+        self.assertEqual(self.found('ПОГОДА'), [self.once])
+        self.assertEqual(self.found('нет такого'), [])
+        self.assertEqual(self.found('""'), [])
+
+    def test_prefix_query(self):
+        self.assertEqual(set(self.found('прив*')), {self.once, self.other})
+        self.assertEqual(self.found('прив'), [])
+
+    def test_results_ranked_by_relevance(self):
+        self.assertEqual(self.found('Казань')[0], self.twice)
+
+    def test_index_follows_edits_and_deletes(self):
+        post = Post.objects.create(text='Уникальное слово', author=self.user)
+        self.assertEqual(self.found('уникальное'), [post])
+        Post.objects.filter(pk=post.pk).update(text='Другой текст')
+        self.assertEqual(self.found('уникальное'), [])
+        self.assertEqual(self.found('другой'), [post])
+        post.delete()
+        self.assertEqual(self.found('другой'), [])
+
+    def test_page_highlights_and_escapes_snippet(self):
+        response = self.guest_client.get(SEARCH, {'q': 'читателей'})
+        post = response.context['page_obj'][0]
+        self.assertEqual(post, self.other)
+        self.assertIn('<mark>читателей</mark>', post.highlighted)
+        self.assertIn('&lt;b&gt;', post.highlighted)
+
+    def test_empty_query_finds_nothing(self):
+        for url in (SEARCH, SEARCH_API):
+            with self.subTest(url=url):
+                response = self.guest_client.get(url, {'q': ' '})
+                self.assertEqual(response.status_code, 200)
+
+    def test_api(self):
+        response = self.guest_client.get(SEARCH_API, {'q': 'казан*'})
+        data = response.json()
+        self.assertEqual([item['id'] for item in data['results']],
+                         [self.twice.pk, self.once.pk])
+        self.assertIsNone(data['next_page'])
+        self.assertIn('<mark>', data['results'][0]['snippet'])
+
+    def test_admin_search_uses_index(self):
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get(reverse('admin:posts_post_changelist'),
+                              {'q': 'погода'})
+        self.assertEqual(list(response.context['cl'].result_list),
+                         [self.once])
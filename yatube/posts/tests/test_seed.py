@@ -0,0 +1,46 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Follow, Group, Post, TimelineEntry
+
+User = get_user_model()
+
+SEED_OPTIONS = {
+    'users': 30,
+    'groups': 3,
+    'posts': 200,
+    'comments': 300,
+    'follows': 100,
+    'seed': 7,
+}
+
+
+class SeedCommandTests(TestCase):
+    def seed(self):
+        call_command('seed_yatube', stdout=StringIO(), **SEED_OPTIONS)
+        return (
+            list(Post.objects.values_list('pk', 'author_id', 'group_id',
+                                          'pub_date')),
+            list(Follow.objects.values_list('user_id', 'author_id')),
+            list(Comment.objects.values_list('post_id', 'created')),
+        )
+
+    def test_seed_creates_requested_rows(self):
+        self.seed()
+        self.assertEqual(User.objects.count(), SEED_OPTIONS['users'])
+        self.assertEqual(Group.objects.count(), SEED_OPTIONS['groups'])
+        self.assertEqual(Post.objects.count(), SEED_OPTIONS['posts'])
+        self.assertEqual(Comment.objects.count(), SEED_OPTIONS['comments'])
+        self.assertEqual(Follow.objects.count(), SEED_OPTIONS['follows'])
+        self.assertTrue(TimelineEntry.objects.exists())
+        post = Post.objects.order_by('-comments_count').first()
+        self.assertEqual(post.comments_count, post.comments.count())
+
+    def test_seed_is_deterministic(self):
+        first = self.seed()
+        for model in (Comment, Post, Follow, Group, User):
+            model.objects.all().delete()
+        self.assertEqual(self.seed(), first)
@@ -0,0 +1,108 @@
+import threading
+from unittest import mock
+
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from core.sqlite import WriteCoordinator, WriteTimeout
+from posts.models import Post
+
+User = get_user_model()
+
+
+class PragmaTests(TestCase):
+    def pragma(self, name):
+        with connection.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_connection_is_configured(self):
+        self.assertEqual(self.pragma('busy_timeout'), 5000)
+        self.assertEqual(self.pragma('cache_size'), -64000)
+        # 1 — NORMAL.
+        self.assertEqual(self.pragma('synchronous'), 1)
+
+
+class WriteCoordinatorTests(TransactionTestCase):
+    def setUp(self):
+        self.writes = WriteCoordinator()
+        self.author = User.objects.create_user(username='author')
+
+    def publish(self, number):
+        return Post.objects.create(author=self.author, text=f'Пост {number}')
+
+    def test_concurrent_writes_are_committed(self):
+        errors = []
+
+        def worker(number):
+            try:
+                self.writes.run(self.publish, number)
+            except Exception as error:
+                errors.append(error)
+
+        threads = [threading.Thread(target=worker, args=(number,))
+                   for number in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(Post.objects.count(), 20)
+
+    def test_result_is_returned_after_commit(self):
+        post = self.writes.run(self.publish, 1)
+        self.assertTrue(Post.objects.filter(pk=post.pk).exists())
+
+    def test_failed_job_does_not_roll_back_others(self):
+        def fail():
+            self.publish(2)
+            raise ValueError('ошибка')
+
+        self.writes.run(self.publish, 1)
+        with self.assertRaises(ValueError):
+            self.writes.run(fail)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Пост 1']
+        )
+
+    def test_runs_inline_inside_transaction(self):
+        with transaction.atomic():
+            thread = self.writes.run(threading.current_thread)
+        self.assertIs(thread, threading.current_thread())
+
+    @override_settings(WRITE_TIMEOUT=0.1)
+    def test_timeout_cancels_queued_job(self):
+        started = threading.Event()
+        release = threading.Event()
+
+        def block():
+            started.set()
+            release.wait()
+
+        def blocker():
+            try:
+                self.writes.run(block)
+            except WriteTimeout:
+                pass
+
+        thread = threading.Thread(target=blocker)
+        thread.start()
+        started.wait()
+        with self.assertRaises(WriteTimeout):
+            self.writes.run(self.publish, 1)
+        release.set()
+        thread.join()
+        self.writes.run(self.publish, 2)
+        self.assertEqual(
+            list(Post.objects.values_list('text', flat=True)), ['Пост 2']
+        )
+
+    def test_loop_survives_failed_batch(self):
+        with mock.patch.object(self.writes, '_commit',
+                               side_effect=RuntimeError('сбой')):
+            with self.assertRaises(RuntimeError), \
+                    self.assertLogs('core.sqlite', 'ERROR'):
+                self.writes.run(self.publish, 1)
+        self.writes.run(self.publish, 2)
+        self.assertEqual(Post.objects.count(), 1)
@@ -0,0 +1,100 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import transaction
+from django.test import TransactionTestCase, override_settings
+
+from posts.models import ImageBlob, Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ContentAddressedStorageTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='auth')
+        self.storage = Post._meta.get_field('image').storage
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def create_post(self, filename):
+        return Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile(filename, SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+
+    def test_same_content_is_stored_once(self):
+        first = self.create_post('small.gif')
+        second = self.create_post('other.gif')
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(
+            first.image.name, r'^posts/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}'
+            r'\.gif$'
+        )
+        self.assertEqual(ImageBlob.objects.get(name=first.image.name).refs, 2)
+
+    def test_file_removed_with_last_reference(self):
+        first = self.create_post('small.gif')
+        second = self.create_post('small.gif')
+        path = first.image.path
+        first.delete()
+        self.assertTrue(os.path.exists(path))
+        second.delete()
+        self.assertFalse(os.path.exists(path))
+        self.assertFalse(ImageBlob.objects.exists())
+
+    def test_file_reuploaded_before_commit_is_kept(self):
+        first = self.create_post('small.gif')
+        with transaction.atomic():
+            first.delete()
+            second = self.create_post('other.gif')
+        self.assertTrue(os.path.exists(second.image.path))
+        self.assertEqual(ImageBlob.objects.get(name=second.image.name).refs,
+                         1)
+
+    def test_dedupe_command_moves_old_uploads(self):
+        legacy = [
+            make_legacy_file(self.storage, f'posts/small_{i}.gif')
+            for i in range(2)
+        ]
+        for name in legacy:
+            Post.objects.filter(pk=self.create_post('x.gif').pk).update(
+                image=name
+            )
+        call_command('dedupe_images', stdout=StringIO())
+        names = set(Post.objects.values_list('image', flat=True))
+        self.assertEqual(len(names), 1)
+        self.assertEqual(ImageBlob.objects.get(name=names.pop()).refs, 2)
+        for name in legacy:
+            self.assertFalse(self.storage.exists(name))
+
+
+def make_legacy_file(storage, name):
+    """Кладёт файл под старым плоским именем, минуя хеширование."""
+    path = os.path.join(storage.location, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(ContentFile(SMALL_GIF).read())
+    return name
@@ -0,0 +1,82 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts import follow_graph
+from posts.models import Follow, FollowSuggestion
+
+User = get_user_model()
+
+
+class FollowSuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = {
+            name: User.objects.create_user(username=name)
+            for name in ('anna', 'boris', 'vera', 'gleb', 'dina')
+        }
+        # anna читает boris и vera, те читают gleb; dina читает vera
+        # и anna, а ещё gleb — он похож на vera по подписчикам.
+        for user, author in (
+            ('anna', 'boris'), ('anna', 'vera'),
+            ('boris', 'gleb'), ('vera', 'gleb'),
+            ('dina', 'vera'), ('dina', 'gleb'), ('dina', 'anna'),
+        ):
+            Follow.objects.create(user=cls.users[user],
+                                  author=cls.users[author])
+
+    def setUp(self):
+        cache.clear()
+
+    def suggested(self, name):
+        return list(
+            FollowSuggestion.objects.filter(user=self.users[name])
+            .values_list('author__username', flat=True)
+        )
+
+    def test_friends_of_friends_ranked_first(self):
+        follow_graph.build(k=3, block_size=2)
+        self.assertEqual(self.suggested('anna')[0], 'gleb')
+        self.assertNotIn('anna', self.suggested('anna'))
+        self.assertNotIn('boris', self.suggested('anna'))
+
+    def test_never_suggests_followed_authors(self):
+        follow_graph.build(k=10, block_size=1)
+        for suggestion in FollowSuggestion.objects.all():
+            self.assertNotEqual(suggestion.user_id, suggestion.author_id)
+            self.assertFalse(Follow.objects.filter(
+                user_id=suggestion.user_id, author_id=suggestion.author_id
+            ).exists())
+
+    def test_block_size_does_not_change_result(self):
+        follow_graph.build(k=3, block_size=1)
+        small = list(FollowSuggestion.objects.values_list(
+            'user', 'author', 'rank'))
+        follow_graph.build(k=3, block_size=100)
+        large = list(FollowSuggestion.objects.values_list(
+            'user', 'author', 'rank'))
+        self.assertEqual(small, large)
+
+    def test_pages_show_suggestions(self):
+        call_command('build_suggestions', stdout=StringIO())
+        client = Client()
+        client.force_login(self.users['anna'])
+        for url in (reverse('posts:follow_index'),
+                    reverse('posts:profile', args=('boris',))):
+            with self.subTest(url=url):
+                response = client.get(url)
+                self.assertEqual(
+                    [item.author.username
+                     for item in response.context['suggestions']],
+                    self.suggested('anna'),
+                )
+        Follow.objects.create(user=self.users['anna'],
+                              author=self.users['gleb'])
+        response = client.get(reverse('posts:follow_index'))
+        self.assertNotIn('gleb', [
+            item.author.username for item in response.context['suggestions']
+        ])
@@ -0,0 +1,86 @@
+import shutil
+import tempfile
+from concurrent.futures import Future
+from unittest import mock
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import thumbnails
+from posts.models import Post
+
+User = get_user_model()
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user(username='auth')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.post = Post.objects.create(
+            text='Пост с картинкой',
+            author=self.user,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF,
+                                     content_type='image/gif'),
+        )
+
+    @override_settings(THUMBNAIL_WORKERS=2)
+    def test_missing_thumbnail_is_queued_and_original_shown(self):
+        with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+            response = Client().get(reverse('posts:index'))
+        self.assertContains(response, self.post.image.url)
+        geometry, options = thumbnails.POST_THUMBNAILS[0]
+        enqueue.assert_called_with(self.post.image.name, geometry, options)
+
+    def test_ready_thumbnail_is_served_without_queueing(self):
+        with override_settings(THUMBNAIL_WORKERS=0):
+            thumbnails.warm_post(self.post)
+        with override_settings(THUMBNAIL_WORKERS=2):
+            with mock.patch.object(thumbnails, 'enqueue') as enqueue:
+                response = Client().get(reverse('posts:index'))
+        enqueue.assert_not_called()
+        self.assertNotContains(response, f'src="{self.post.image.url}"')
+        self.assertContains(response, 'cache/')
+
+    def test_generated_thumbnail_refreshes_cached_pages(self):
+        urls = (
+            reverse('posts:index'),
+            reverse('posts:profile', args=[self.user.username]),
+        )
+        with override_settings(THUMBNAIL_WORKERS=2):
+            with mock.patch.object(thumbnails, 'enqueue'):
+                for url in urls:
+                    self.assertContains(Client().get(url),
+                                        f'src="{self.post.image.url}"')
+            geometry, options = thumbnails.POST_THUMBNAILS[0]
+            thumbnails._generate(self.post.image.name, geometry, options)
+            # Страницы сбрасывает колбэк пула в процессе сайта.
+            future = Future()
+            future.set_result(None)
+            thumbnails._done((self.post.image.name, geometry, ()), future)
+            for url in urls:
+                with self.subTest(url=url):
+                    self.assertContains(Client().get(url), 'cache/')
@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from posts import timeline
+from posts.models import Follow, Post, TimelineEntry
+
+User = get_user_model()
+
+FOLLOW_INDEX = reverse('posts:follow_index')
+
+
+class TimelineTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.old_post = Post.objects.create(text='Старый пост',
+                                           author=cls.author)
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+        self.follower_client = Client()
+        self.follower_client.force_login(self.follower)
+
+    def follow(self):
+        self.follower_client.get(
+            reverse('posts:profile_follow', args=[self.author.username]))
+
+    def feed(self):
+        response = self.follower_client.get(FOLLOW_INDEX)
+        return [post.text for post in response.context['page_obj']]
+
+    def test_follow_backfills_and_unfollow_cleans_up(self):
+        self.follow()
+        self.assertEqual(self.feed(), [self.old_post.text])
+        self.follower_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username]))
+        self.assertEqual(self.feed(), [])
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_new_post_is_fanned_out(self):
+        self.follow()
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Новый пост'})
+        self.assertEqual(self.feed(), ['Новый пост', self.old_post.text])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 2)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=1)
+    def test_popular_author_is_pulled(self):
+        self.follow()
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Новый пост'})
+        self.assertEqual(self.feed(), ['Новый пост', self.old_post.text])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 0)
+
+    @override_settings(TIMELINE_FANOUT_LIMIT=2)
+    def test_posts_from_pull_mode_stay_after_switch_back(self):
+        self.follow()
+        Follow.objects.create(user=User.objects.create_user('other'),
+                              author=self.author)
+        # Кеш набора pull-авторов истёк: автор подтягивается при чтении.
+        cache.delete(timeline.PULL_AUTHORS_KEY)
+        self.author_client.post(reverse('posts:post_create'),
+                                {'text': 'Новый пост'})
+        self.assertEqual(self.feed(), ['Новый пост', self.old_post.text])
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 1)
+        # Отписка возвращает автора в push-режим и раскладывает его посты.
+        Follow.objects.filter(user__username='other').delete()
+        self.assertEqual(
+            TimelineEntry.objects.filter(user=self.follower).count(), 2)
+        self.assertEqual(self.feed(), ['Новый пост', self.old_post.text])
+
+    def test_orm_writes_update_timeline(self):
+        follow = Follow.objects.create(user=self.follower, author=self.author)
+        Post.objects.create(text='Новый пост', author=self.author)
+        self.assertEqual(self.feed(), ['Новый пост', self.old_post.text])
+        follow.delete()
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    @override_settings(TIMELINE_BACKFILL=1)
+    def test_rebuild_keeps_backfill_limit(self):
+        self.follow()
+        new_post = Post.objects.create(text='Новый пост', author=self.author)
+        timeline.rebuild()
+        self.assertEqual(
+            list(TimelineEntry.objects.values_list('post_id', flat=True)),
+            [new_post.pk])
@@ -5,6 +5,7 @@ from django.test import Client, TestCase
 from django.urls import reverse
 from django.core.cache import cache
 
+from posts import caching
 from posts.models import Group, Post, User, Comment, Follow
 
 User = get_user_model()
@@ -156,13 +157,25 @@ class PostPagesTests(TestCase):
 
     def test_cache(self):
         test_page = self.guest_client.get(INDEX).content
-        self.post.text = 'Новый текст поста'
-        self.post.save()
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
         page1 = self.guest_client.get(INDEX).content
         self.assertEqual(page1, test_page)
-        cache.clear()
+        self.post.text = 'Новый текст поста'
+        self.post.save()
         page2 = self.guest_client.get(INDEX).content
         self.assertNotEqual(page2, test_page)
+        self.assertIn(self.post.text, page2.decode())
+
+    def test_post_card_cache(self):
+        self.guest_client.get(INDEX)
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
+        caching.bump('index')
+        page = self.guest_client.get(INDEX).content.decode()
+        self.assertIn(self.post.text, page)
+        self.post.text = 'Отредактированный текст'
+        self.post.save()
+        page = self.guest_client.get(INDEX).content.decode()
+        self.assertIn('Отредактированный текст', page)
 
     def test_authorized_client_subscribe_to_author(self):
         follower_count = Follow.objects.all().count()
@@ -0,0 +1,140 @@
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from sorl.thumbnail import default
+from sorl.thumbnail.base import ThumbnailBackend
+from sorl.thumbnail.conf import defaults as sorl_defaults
+from sorl.thumbnail.conf import settings as sorl_settings
+from sorl.thumbnail.images import ImageFile
+from sorl.thumbnail.kvstores.base import add_prefix
+
+from core.sqlite import writes
+
+logger = logging.getLogger(__name__)
+
+# Все размеры, которые используют шаблоны постов (post_card.html,
+# post_detail.html). Новый {% thumbnail %} нужно добавить и сюда.
+POST_THUMBNAILS = (
+    ('960x339', {'crop': 'center', 'upscale': True}),
+)
+
+_executor = None
+_pending = set()
+_lock = threading.Lock()
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _generate(name, geometry_string, options):
+    """Выполняется в процессе пула: создаёт миниатюру."""
+    from .models import Post
+
+    # Ключ миниатюры зависит от хранилища исходника: то же, что у поля,
+    # иначе шаблон ({% thumbnail post.image %}) её не найдёт.
+    source = ImageFile(name, Post._meta.get_field('image').storage)
+    ThumbnailBackend().get_thumbnail(source, geometry_string, **options)
+
+
+def refresh_posts(name):
+    """update() обходит сигналы: версии страниц сдвигаем сами.
+
+    Вызывается в процессе сайта (см. _done): с LocMemCache процесс пула
+    сдвинул бы версии только в своей памяти.
+    """
+    from django.utils import timezone
+
+    from . import caching
+    from .models import Post
+
+    posts = Post.objects.filter(image=name)
+    rows = set(posts.values_list('author__username', 'group__slug'))
+    posts.update(updated=timezone.now())
+    if rows:
+        caching.bump_on_commit(
+            'index',
+            *{f'profile:{username}' for username, _ in rows},
+            *{f'group:{slug}' for _, slug in rows if slug},
+        )
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+        )
+    return _executor
+
+
+def _done(key, future):
+    with _lock:
+        _pending.discard(key)
+    if future.exception() is not None:
+        logger.error('Thumbnail %s failed: %s', key, future.exception())
+        return
+    # Миниатюра готова: сбрасываем карточки и страницы постов с ней.
+    try:
+        writes.run(refresh_posts, key[0])
+    except Exception:
+        logger.exception('Refreshing posts for %s failed', key[0])
+
+
+def enqueue(name, geometry_string, options):
+    key = (name, geometry_string, tuple(sorted(options.items())))
+    with _lock:
+        if key in _pending:
+            return
+        _pending.add(key)
+    future = _get_executor().submit(_generate, name, geometry_string, options)
+    future.add_done_callback(lambda future: _done(key, future))
+
+
+def warm_post(post):
+    """Ставит в очередь все миниатюры картинки поста."""
+    if not post.image:
+        return
+    for geometry_string, options in POST_THUMBNAILS:
+        default.backend.get_thumbnail(post.image, geometry_string, **options)
+
+
+class PregeneratedThumbnailBackend(ThumbnailBackend):
+    """Отдаёт только готовые миниатюры, недостающие ставит в очередь.
+
+    Пока миниатюры нет, {% thumbnail %} рендерит блок {% empty %}.
+    При THUMBNAIL_WORKERS = 0 миниатюры создаются сразу, как в sorl.
+    """
+
+    def get_thumbnail(self, file_, geometry_string, **options):
+        if not settings.THUMBNAIL_WORKERS:
+            return super().get_thumbnail(file_, geometry_string, **options)
+        if not file_:
+            raise ValueError('falsey file_ argument in get_thumbnail()')
+        requested = dict(options)
+        source = ImageFile(file_)
+        if sorl_settings.THUMBNAIL_PRESERVE_FORMAT:
+            options.setdefault('format', self._get_format(source))
+        for key, value in self.default_options.items():
+            options.setdefault(key, value)
+        for key, attr in self.extra_options:
+            value = getattr(sorl_settings, attr)
+            if value != getattr(sorl_defaults, attr):
+                options.setdefault(key, value)
+        name = self._get_thumbnail_filename(source, geometry_string, options)
+        thumbnail = ImageFile(name, default.storage)
+        cached = default.kvstore.get(thumbnail)
+        if cached:
+            return cached
+        # sorl кеширует промах надолго, а миниатюру запишет другой
+        # процесс: забываем промах, чтобы увидеть её, когда будет готова.
+        if hasattr(default.kvstore, 'cache'):
+            default.kvstore.cache.delete(add_prefix(thumbnail.key))
+        enqueue(source.name, geometry_string, requested)
+        return None
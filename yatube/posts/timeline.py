@@ -0,0 +1,197 @@
+from itertools import islice
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, transaction
+from django.db.models import Count, F, Q
+
+from .models import Follow, Post, TimelineEntry
+
+PULL_AUTHORS_KEY = 'timeline:pull_authors'
+PULL_AUTHORS_TIMEOUT = 600
+# Поле ленты для курсора: дата из TimelineEntry, а не из Post.
+FEED_FIELD = 'feed_date'
+BATCH_SIZE = 1000
+
+
+def pull_author_ids():
+    """Авторы, у которых подписчиков больше TIMELINE_FANOUT_LIMIT.
+
+    Их посты не раскладываются по лентам при публикации, а
+    подтягиваются при чтении. Набор кешируется, чтобы решение
+    "push или pull" при записи и при чтении было одинаковым.
+    """
+    author_ids = cache.get(PULL_AUTHORS_KEY)
+    if author_ids is None:
+        author_ids = set(
+            Follow.objects.values('author_id')
+            .annotate(followers=Count('id'))
+            .filter(followers__gte=settings.TIMELINE_FANOUT_LIMIT)
+            .values_list('author_id', flat=True)
+        )
+        cache.set(PULL_AUTHORS_KEY, author_ids, PULL_AUTHORS_TIMEOUT)
+    return author_ids
+
+
+def forget_pull_authors():
+    """Сбрасывает набор pull-авторов сейчас и после коммита.
+
+    Иначе чтение до коммита закешировало бы старый набор.
+    """
+    cache.delete(PULL_AUTHORS_KEY)
+    if transaction.get_connection().in_atomic_block:
+        transaction.on_commit(lambda: cache.delete(PULL_AUTHORS_KEY))
+
+
+def follower_removed(author_id):
+    """Возвращает автора в push-режим после отписки.
+
+    Срабатывает на отписке, после которой подписчиков стало меньше
+    TIMELINE_FANOUT_LIMIT: посты автора раскладываются по лентам
+    (см. refill), а набор pull-авторов пересчитывается.
+    """
+    followers = Follow.objects.filter(author_id=author_id).count()
+    if followers != settings.TIMELINE_FANOUT_LIMIT - 1:
+        return
+    refill([author_id])
+    forget_pull_authors()
+
+
+def refill(author_ids):
+    """Раскладывает посты авторов, вернувшихся в push-режим.
+
+    Пока автор был в pull-режиме, его посты в ленты не попадали:
+    без этого они пропали бы из лент, как только автор перестал
+    подтягиваться при чтении.
+    """
+    for author_id in author_ids:
+        posts = list(
+            Post.objects.filter(author_id=author_id)
+            .values_list('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+        )
+        follower_ids = (
+            Follow.objects.filter(author_id=author_id)
+            .values_list('user_id', flat=True)
+            .iterator()
+        )
+        entries = (
+            TimelineEntry(user_id=user_id, post_id=post_id,
+                          author_id=author_id, pub_date=pub_date)
+            for user_id in follower_ids
+            for post_id, pub_date in posts
+        )
+        while True:
+            batch = list(islice(entries, BATCH_SIZE))
+            if not batch:
+                break
+            TimelineEntry.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post):
+    """Раскладывает новый пост по лентам подписчиков автора."""
+    if post.author_id in pull_author_ids():
+        return
+    follower_ids = (
+        Follow.objects.filter(author_id=post.author_id)
+        .values_list('user_id', flat=True)
+        .iterator()
+    )
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user_id=user_id, post=post,
+                          author_id=post.author_id, pub_date=post.pub_date)
+            for user_id in follower_ids
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def backfill(user, author):
+    """Добавляет в ленту свежие посты автора после подписки."""
+    if author.pk in pull_author_ids():
+        return
+    posts = author.posts.only('pk', 'pub_date')[:settings.TIMELINE_BACKFILL]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(user=user, post_id=post.pk, author=author,
+                          pub_date=post.pub_date)
+            for post in posts
+        ),
+        ignore_conflicts=True,
+    )
+
+
+def cleanup(user_id, author_id):
+    """Убирает посты автора из ленты после отписки."""
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def _timeline(user):
+    """Посты ленты подписок и выражение их даты в ленте."""
+    pulled = list(
+        Follow.objects.filter(user=user, author_id__in=pull_author_ids())
+        .values_list('author_id', flat=True)
+    )
+    if not pulled:
+        return (Post.objects.filter(timeline_entries__user=user),
+                F('timeline_entries__pub_date'))
+    pushed = Q(pk__in=TimelineEntry.objects.filter(user=user)
+               .values('post_id'))
+    return Post.objects.filter(pushed | Q(author_id__in=pulled)), F('pub_date')
+
+
+def timeline_posts(user):
+    """Посты ленты подписок: разложенные и pull-авторов."""
+    return _timeline(user)[0]
+
+
+def feed_posts(user):
+    """Посты ленты подписок с датой для курсора в FEED_FIELD.
+
+    Разложенные посты упорядочены по TimelineEntry.pub_date: страница —
+    один диапазон по индексу (user, pub_date). Если среди подписок есть
+    популярные авторы, их посты добавляются pull-запросом по author_id.
+    Для агрегатов нужен timeline_posts: с аннотацией Django оборачивает
+    запрос в GROUP BY.
+    """
+    posts, date = _timeline(user)
+    return posts.annotate(**{FEED_FIELD: date})
+
+
+def rebuild(users=None):
+    """Пересобирает ленты одним INSERT ... SELECT по подпискам.
+
+    users — queryset с id подписчиков (values('user_id')), чьи ленты
+    пересобрать; None — все ленты. Как и backfill, берёт только
+    TIMELINE_BACKFILL свежих постов каждого автора.
+    """
+    cache.delete(PULL_AUTHORS_KEY)
+    pulled = sorted(pull_author_ids())
+    where = 'f.user_id IS NOT NULL AND p.position <= %s'
+    params = [settings.TIMELINE_BACKFILL]
+    entries = TimelineEntry.objects.all()
+    if users is not None:
+        users_sql, users_params = users.query.sql_with_params()
+        where += f' AND f.user_id IN ({users_sql})'
+        params.extend(users_params)
+        entries = entries.filter(user_id__in=users)
+    if pulled:
+        where += ' AND f.author_id NOT IN ({})'.format(
+            ', '.join(['%s'] * len(pulled))
+        )
+        params.extend(pulled)
+    sql = (
+        f'INSERT INTO {TimelineEntry._meta.db_table} '
+        f'(user_id, post_id, author_id, pub_date) '
+        f'SELECT f.user_id, p.id, p.author_id, p.pub_date '
+        f'FROM {Follow._meta.db_table} f '
+        f'JOIN (SELECT id, author_id, pub_date, ROW_NUMBER() OVER ('
+        f'PARTITION BY author_id ORDER BY pub_date DESC, id DESC'
+        f') AS position FROM {Post._meta.db_table}) p '
+        f'ON p.author_id = f.author_id '
+        f'WHERE {where}'
+    )
+    with transaction.atomic():
+        entries.delete()
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
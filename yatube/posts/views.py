@@ -2,72 +2,150 @@ import datetime as dt
 
 from django.conf import settings
 from django.contrib.auth.decorators import login_required
-from django.core.paginator import Paginator
+from django.core.exceptions import PermissionDenied
+from django.http import Http404, JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404, redirect, render
-from django.views.decorators.cache import cache_page
+from django.urls import reverse
 
+from core.sqlite import writes
 from .forms import PostForm, CommentForm
 from .models import Group, Post, User, Comment, Follow
+from .paginators import (CachedCountPaginator, get_comments_page,
+                         get_page_obj)
+from . import (counters, export, search, suggestions, thumbnails,
+               timeline)
+from .caching import versioned_cache_page
+from .conditional import conditional_page, follow_state, post_state
 
 
-@cache_page(20)
+@versioned_cache_page('index')
 def index(request):
-    posts = Post.objects.all()
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = get_page_obj(request, Post.objects.for_feed(),
+                            scopes=('index',))
     context = {'page_obj': page_obj}
     return render(request, 'posts/index.html', context)
 
 
+@versioned_cache_page('group:{slug}')
 def group_posts(request, slug):
     group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()[:10]
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {'group': group, 'posts': posts, 'page_obj': page_obj}
+    page_obj = get_page_obj(request, group.posts.for_feed(),
+                            count=group.posts_count)
+    context = {'group': group, 'page_obj': page_obj}
     return render(request, 'posts/group_list.html', context)
 
 
+@versioned_cache_page('profile:{username}')
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    posts = author.posts.all()
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    following = (
-        request.user.is_authenticated and Follow.objects.filter(
-            user=request.user,
-            author__username=username
-        ).exists()
-    )
+    author = get_object_or_404(User.objects.select_related('stats'),
+                               username=username)
+    stats = counters.user_stats(author)
+    page_obj = get_page_obj(request, author.posts.for_feed(),
+                            count=stats.posts_count)
     return render(
         request,
         'posts/profile.html',
         {
             'author': author,
+            'stats': stats,
             'page_obj': page_obj,
-            'paginator': paginator,
-            'following': following,
+            'paginator': page_obj.paginator,
         }
     )
 
 
+def search_page(request):
+    query = request.GET.get('q', '').strip()
+    results = search.search_posts(Post.objects.for_feed(), query)
+    page_obj = CachedCountPaginator(
+        results, settings.POSTS_PER_PAGE, scopes=('index',)
+    ).get_page(request.GET.get('page'))
+    for post in page_obj:
+        post.highlighted = search.highlight(post.snippet)
+    context = {'query': query, 'page_obj': page_obj}
+    return render(request, 'posts/search.html', context)
+
+
+def search_api(request):
+    query = request.GET.get('q', '').strip()
+    results = search.search_posts(Post.objects.for_feed(), query)
+    page_obj = CachedCountPaginator(
+        results, settings.POSTS_PER_PAGE, scopes=('index',)
+    ).get_page(request.GET.get('page'))
+    return JsonResponse({
+        'query': query,
+        'page': page_obj.number,
+        'next_page': (page_obj.next_page_number()
+                      if page_obj.has_next() else None),
+        'results': [
+            {
+                'id': post.pk,
+                'url': request.build_absolute_uri(
+                    reverse('posts:post_detail', args=(post.pk,))
+                ),
+                'author': post.author.username,
+                'group': post.group.slug if post.group else None,
+                'pub_date': post.pub_date.isoformat(),
+                'rank': post.rank,
+                'snippet': str(search.highlight(post.snippet)),
+            }
+            for post in page_obj
+        ],
+    }, json_dumps_params={'ensure_ascii': False})
+
+
+@login_required
+def profile_export(request, username):
+    author = get_object_or_404(User, username=username)
+    if request.user != author and not request.user.is_staff:
+        raise PermissionDenied
+    format = request.GET.get('format', 'ndjson')
+    if format not in export.CONTENT_TYPES:
+        raise Http404
+    response = StreamingHttpResponse(
+        export.export_lines(author, format),
+        content_type=export.CONTENT_TYPES[format],
+    )
+    response['Content-Disposition'] = (
+        f'attachment; filename="{author.username}.{format}"'
+    )
+    return response
+
+
+@conditional_page(post_state)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = get_object_or_404(
+        Post.objects.select_related('author__stats', 'group'), pk=post_id
+    )
     form = CommentForm(request.POST or None)
-    author_posts_count = Post.objects.filter(author_id=post.author_id).count()
-    comments = Comment.objects.filter(post_id=post_id)
+    author_posts_count = counters.user_stats(post.author).posts_count
     context = {
         'year': dt.datetime.now().year,
         'post': post,
         'author_posts_count': author_posts_count,
         'form': form,
-        'comments': comments}
+        'comments': get_comments_page(request, post_comments(post_id))}
     return render(request, 'posts/post_detail.html', context)
 
 
+def post_comments(post_id):
+    # Страница комментариев — диапазон по индексу (post, created).
+    return Comment.objects.filter(post_id=post_id).select_related(
+        'author'
+    ).only('text', 'created', 'post_id', 'author__username')
+
+
+def comments_fragment(request, post_id):
+    """Следующая страница комментариев без остальной страницы поста."""
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    context = {
+        'post_id': post_id,
+        'comments': get_comments_page(request, post_comments(post_id)),
+    }
+    return render(request, 'posts/includes/comments.html', context)
+
+
 @login_required
 def post_create(request):
     form = PostForm(request.POST or None, files=request.FILES or None)
@@ -75,7 +153,8 @@ def post_create(request):
         return render(request, 'posts/create_post.html', {'form': form})
     post = form.save(commit=False)
     post.author = request.user
-    post.save()
+    writes.run(post.save)
+    thumbnails.warm_post(post)
     return redirect('posts:profile', username=request.user.username)
 
 
@@ -84,11 +163,12 @@ def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if request.user != post.author:
         return redirect('posts:post_detail', post_id=post.id)
-    form = PostForm(request.POST or None, instance=post,)
+    form = PostForm(request.POST or None, files=request.FILES or None,
+                    instance=post)
     if not form.is_valid():
         return render(request, 'posts/update_post.html', {'form': form,
                                                           'post': post})
-    form.save()
+    thumbnails.warm_post(writes.run(form.save))
     return redirect('posts:post_detail', post_id=post_id)
 
 
@@ -100,17 +180,25 @@ def add_comment(request, post_id):
         comment = form.save(commit=False)
         comment.author = request.user
         comment.post = post
-        comment.save()
+        writes.run(comment.save)
         return redirect('posts:post_detail', post_id=post_id)
 
 
 @login_required
+@conditional_page(follow_state)
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user).all()
-    paginator = Paginator(posts, settings.POSTS_PER_PAGE)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
-    context = {'page_obj': page_obj, 'paginator': paginator}
+    posts = timeline.feed_posts(request.user).for_feed()
+    # Подписки меняют область профиля подписчика (signals.py).
+    page_obj = get_page_obj(
+        request, posts,
+        scopes=('index', f'profile:{request.user.username}'),
+        field=timeline.FEED_FIELD,
+    )
+    context = {
+        'page_obj': page_obj,
+        'paginator': page_obj.paginator,
+        'suggestions': suggestions.suggestions_for(request.user),
+    }
     return render(request, 'posts/follow.html', context)
 
 
@@ -118,16 +206,17 @@ def follow_index(request):
 def profile_follow(request, username):
     follow_user = get_object_or_404(User, username=username)
     if request.user != follow_user:
-        Follow.objects.get_or_create(user=request.user, author=follow_user)
+        writes.run(Follow.objects.get_or_create,
+                   user=request.user, author=follow_user)
     return redirect('posts:profile', username=username)
 
 
 @login_required
 def profile_unfollow(request, username):
     unfollow_user = get_object_or_404(User, username=username)
-    get_object_or_404(
-        Follow,
+    writes.run(get_object_or_404(
+        Follow.objects.select_related('user', 'author'),
         user=request.user,
         author=unfollow_user
-    ).delete()
+    ).delete)
     return redirect('posts:profile', username=username)
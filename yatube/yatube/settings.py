@@ -39,6 +39,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'core.replicas.ReplicaPinMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -76,9 +77,47 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        # Соединение живёт между запросами: PRAGMA (core/sqlite.py)
+        # выполняются один раз на соединение, а не на каждый запрос.
+        'CONN_MAX_AGE': 600,
     }
 }
 
+# PRAGMA для каждого нового SQLite-соединения. WAL: читатели не ждут
+# писателя; synchronous=NORMAL в WAL теряет при сбое питания только
+# последние коммиты, но не портит базу. cache_size < 0 — в КиБ.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'cache_size': -64000,
+    'mmap_size': 256 * 1024 * 1024,
+    'temp_store': 'MEMORY',
+}
+# Записи из views идут через одну очередь процесса (core.sqlite.writes)
+# и фиксируются пачками до WRITE_BATCH_SIZE штук. Запрос ждёт свою
+# запись не дольше WRITE_TIMEOUT секунд.
+WRITE_COORDINATOR = True
+WRITE_BATCH_SIZE = 64
+WRITE_TIMEOUT = 30
+
+# Реплики только для чтения (core/replicas.py). Локально это копии
+# db.sqlite3, которые обновляет manage.py replicate_sqlite.
+DATABASE_REPLICAS = [
+    f'replica{number}'
+    for number in range(1, int(os.environ.get('YATUBE_REPLICAS', 0)) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db.{alias}.sqlite3'),
+        'CONN_MAX_AGE': 600,
+        'TEST': {'MIRROR': 'default'},
+    }
+DATABASE_ROUTERS = ['core.replicas.ReplicaRouter']
+# Сколько секунд после записи сессия читает с основной базы.
+REPLICA_PIN_SECONDS = 5
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -130,6 +169,21 @@ EMAIL_BACKEND = 'django.core.mail.backends.filebased.EmailBackend'
 EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 
 POSTS_PER_PAGE = 10
+COMMENTS_PER_PAGE = 20
+
+# Рекомендации подписок (manage.py build_suggestions): сколько хранить
+# и показывать на пользователя, сколько строк графа умножать за раз.
+FOLLOW_SUGGESTIONS = 20
+FOLLOW_SUGGESTIONS_SHOWN = 5
+FOLLOW_SUGGESTIONS_BLOCK_SIZE = 10000
+
+# Строк, которые экспорт читает из базы за один fetchmany().
+EXPORT_CHUNK_SIZE = 2000
+
+# Лента подписок: у авторов с большим числом подписчиков посты не
+# раскладываются по лентам, а подтягиваются при чтении
+TIMELINE_FANOUT_LIMIT = 1000
+TIMELINE_BACKFILL = 1000
 
 USE_TZ = True
 TIME_ZONE = 'Europe/Moscow'
@@ -139,6 +193,24 @@ CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Миниатюры создаются пулом процессов (posts/thumbnails.py), а не при
+# рендеринге; 0 — создавать сразу в запросе
+THUMBNAIL_BACKEND = 'posts.thumbnails.PregeneratedThumbnailBackend'
+THUMBNAIL_WORKERS = 2
+
+# Страницы лент сбрасываются при изменении данных (posts/caching.py),
+# поэтому могут жить в кеше часами
+PAGE_CACHE_TIMEOUT = 60 * 60 * 3
+# После истечения или смены версии запись ещё CACHE_STALE_TIMEOUT секунд
+# отдаётся, пока один процесс (блокировка на CACHE_LOCK_TIMEOUT секунд)
+# её пересчитывает; без записи остальные ждут до CACHE_LOCK_WAIT секунд.
+CACHE_STALE_TIMEOUT = 60 * 10
+CACHE_LOCK_TIMEOUT = 30
+CACHE_LOCK_WAIT = 2
+# Счётчики hit/miss/stale (api/cache-stats/) учитывают одно событие из
+# CACHE_STATS_SAMPLE.
+CACHE_STATS_SAMPLE = 100
+
 CACHES = {
     'default': {
         'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',